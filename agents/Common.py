@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import lru_cache
 from typing import Optional
 import numpy as np
 from numpy import ndarray
@@ -19,6 +20,18 @@ PLAYER2_PRINT = BoardPiecePrint('O')
 
 PlayerAction = np.int8  # The column to be played
 
+ROWS = 6  # default shape of the board
+COLUMNS = 7
+CONNECT_N = 4  # default number of pieces in a row needed to win
+
+# flags of the results in agents.cache, here so that the search engine doesn't need to import the cache
+EXACT = 0  # the score is the value of the position
+LOWER = 1  # the value of the position is at least the score (the search failed high)
+UPPER = 2  # the value of the position is at most the score (the search failed low)
+
+# results of agents.tablebase for the player to move, 0 is not used
+LOSS, DRAW, WIN = 1, 2, 3
+
 
 class SavedState:
     pass
@@ -30,6 +43,8 @@ GenMove = Callable[
 ]
 
 translation = str.maketrans("012[]", " XO||")
+PIECE_PRINT = {NO_PLAYER: NO_PLAYER_PRINT, PLAYER1: PLAYER1_PRINT, PLAYER2: PLAYER2_PRINT}
+PRINT_PIECE = {printed: piece for piece, printed in PIECE_PRINT.items()}
 
 
 class GameState(Enum):
@@ -38,17 +53,59 @@ class GameState(Enum):
     STILL_PLAYING = 0
 
 
-def initialize_game_state() -> np.ndarray:
+class Geometry:
+    """
+    Shape of the board and number of pieces in a row needed to win, with the index tables of all the
+    horizontal, vertical and diagonal windows of n cells. The tables are computed once per geometry
+    (see get_geometry), so that the primitives don't have to walk the lines of the board on every call.
+    """
+
+    def __init__(self, rows: int = ROWS, columns: int = COLUMNS, n: int = CONNECT_N):
+        """
+        :param rows: rows of the board
+        :param columns: columns of the board
+        :param n: number of pieces in a row needed to win
+        """
+        self.rows = rows
+        self.columns = columns
+        self.n = n
+
+        windows = []
+        for row in range(rows):
+            for column in range(columns):
+                for d_row, d_column in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row, end_column = row + (n - 1) * d_row, column + (n - 1) * d_column
+                    if 0 <= end_row < rows and 0 <= end_column < columns:
+                        windows.append([(row + i * d_row) * columns + column + i * d_column for i in range(n)])
+        # flat indices of the cells of every window, shape (number of windows, n)
+        self.windows = np.array(windows, dtype=np.intp).reshape(-1, n)
+        # for every cell (flat index), the windows that contain it
+        self.cell_windows = tuple(self.windows[np.any(self.windows == cell, axis=1)]
+                                  for cell in range(rows * columns))
+
+
+@lru_cache(maxsize=None)
+def get_geometry(rows: int = ROWS, columns: int = COLUMNS, n: int = CONNECT_N) -> Geometry:
+    """
+    :return: the Geometry of a board of shape (rows, columns) where n pieces in a row win, shared by all callers
+    """
+    return Geometry(rows, columns, n)
+
+
+def initialize_game_state(rows: int = ROWS, columns: int = COLUMNS) -> np.ndarray:
     """
-    :return board: an ndarray, shape (6, 7) and data type (dtype) BoardPiece, initialized to 0 (NO_PLAYER).
+    :param rows: rows of the board
+    :param columns: columns of the board
+    :return board: an ndarray, shape (rows, columns), (6, 7) by default, and data type (dtype) BoardPiece,
+    initialized to 0 (NO_PLAYER).
     """
-    board: ndarray = np.zeros((6, 7), dtype=BoardPiece)
+    board: ndarray = np.zeros((rows, columns), dtype=BoardPiece)
     return board
 
 
 def pretty_print_board(board: np.ndarray) -> str:
     """
-    :param board: current state of the board in a ndarray, shape (6, 7) and data type (dtype) BoardPiece
+    :param board: current state of the board in a ndarray, shape (rows, columns) and data type (dtype) BoardPiece
     :return human_board: `board` converted to a human readable string representation,
     to be used when playing or printing diagnostics to the console (stdout). The piece in
     board[0, 0] should appear in the lower-left. Here's an example output:
@@ -63,31 +120,81 @@ def pretty_print_board(board: np.ndarray) -> str:
     |0 1 2 3 4 5 6 |
     """
 
-    human_board: str = "|=============|\n"
-    flipped_board = np.flipud(board)
-    string_board: str = np.array2string(flipped_board)[1:-1].replace("\n ", "\n")
-    human_board += string_board.translate(translation)
-    human_board += "\n|=============|\n"
-    human_board += "|0 1 2 3 4 5 6|"
+    columns = board.shape[1]
+    border = "|" + "=" * (2 * columns - 1) + "|"
+    lines = [border]
+    for row in np.flipud(board):
+        lines.append("|" + " ".join(PIECE_PRINT[piece] for piece in row) + "|")
+    lines.append(border)
+    lines.append("|" + " ".join(str(column % 10) for column in range(columns)) + "|")
+    human_board: str = "\n".join(lines)
     return human_board
 
 
 def string_to_board(pp_board: str) -> np.ndarray:
     """
-    :param pp_board: output of pretty_print_board
+    :param pp_board: output of pretty_print_board, for a board of any shape
     :return new_board: takes pp_board and turns it back into an ndarray.
     """
-    pp_board = pp_board.replace(" ", "0").replace("X", "1").replace("O", "2").replace("|", "")
-    partial_board = np.array(pp_board.splitlines()[1:-2])
+    lines = pp_board.splitlines()[1:-2]
+    columns = (len(lines[0].strip()) - 1) // 2
+    rows = []
+    for line in lines:
+        # pieces are every other character between the two '|', trailing spaces may have been stripped
+        cells = line.strip()[1:-1].ljust(2 * columns - 1)[::2]
+        try:
+            rows.append([PRINT_PIECE[cell] for cell in cells])
+        except KeyError as error:
+            raise ValueError(f"{line!r} is not a row of a pretty printed board") from error
+    new_board = np.array(rows, dtype=BoardPiece)
+    return np.flipud(new_board)
 
-    new_board = np.zeros((6, 13))
 
-    for i in range(len(partial_board)):
-        new_board[i] = np.array(list(partial_board[i]), dtype=BoardPiece)
-    index = [i for i in range(1, 13, 2)]
+def board_to_packed(board: np.ndarray) -> str:
+    """
+    :param board: board to be packed
+    :return packed_board: one digit (0, 1 or 2) per cell, row by row starting at board[0, 0],
+    e.g. 42 characters for a 6x7 board
+    """
+    return "".join(str(piece) for piece in board.ravel())
+
+
+def packed_to_board(packed_board: str, shape: Tuple[int, int] = (6, 7)) -> np.ndarray:
+    """
+    :param packed_board: output of board_to_packed
+    :param shape: shape of the packed board
+    :return board: packed_board turned back into an ndarray
+    """
+    if len(packed_board) != shape[0] * shape[1] or not set(packed_board) <= set("012"):
+        raise ValueError(f"{packed_board!r} is not a packed board of shape {shape}")
+    return np.array(list(packed_board), dtype=BoardPiece).reshape(shape)
 
-    new_board = np.delete(new_board, index, 1).astype(BoardPiece)
-    return np.flipud(new_board)
+
+def moves_to_board(moves: str, rows: int = ROWS, columns: int = COLUMNS) -> np.ndarray:
+    """
+    :param moves: columns played so far, one digit per move, starting with PLAYER1, e.g. "3342"
+    :param rows: rows of the board
+    :param columns: columns of the board
+    :return board: board obtained by playing the moves on an empty board
+    """
+    board = initialize_game_state(rows, columns)
+    player = PLAYER1
+    for move in moves:
+        if not move.isdigit() or not 0 <= int(move) < board.shape[1] or np.all(board[:, int(move)] != NO_PLAYER):
+            raise ValueError(f"{moves!r} contains the illegal move {move!r}")
+        apply_player_action(board, PlayerAction(move), player)
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+    return board
+
+
+def player_to_move(board: np.ndarray) -> BoardPiece:
+    """
+    :param board: board of a game where PLAYER1 moved first
+    :return: player who plays the next move on this board
+    """
+    if np.count_nonzero(board == PLAYER1) > np.count_nonzero(board == PLAYER2):
+        return PLAYER2
+    return PLAYER1
 
 
 def apply_player_action(
@@ -139,61 +246,47 @@ def search_sequence_numpy(arr, seq) -> np.ndarray:
 
 
 def connected_four(
-        board: np.ndarray, player: BoardPiece, last_action: Optional[PlayerAction] = None,
+        board: np.ndarray, player: BoardPiece, last_action: Optional[PlayerAction] = None, n: int = CONNECT_N,
 ) -> bool:
     """
     :param board: board that is going to be evaluated
     :param player: player for which we look for a sequence of 4 pieces
     :param last_action: If desired, the last action taken (i.e. last column played) can be provided
-    for potential speed optimisation.
-    :return: True if there are four adjacent pieces equal to `player` arranged
+    for potential speed optimisation: only the windows through the top piece of that column are checked.
+    :param n: number of adjacent pieces we look for, 4 by default
+    :return: True if there are four (n) adjacent pieces equal to `player` arranged
     in either a horizontal, vertical, or diagonal line. Returns False otherwise.
 
     """
-
-    sequence = player * np.ones(4)
-    board_transposed = board.T
-    board_flipped = np.flipud(board)
-    rows, columns = board.shape
-    for row in range(rows):
-        found = np.array(search_sequence_numpy(board[row], sequence))
-        if found.shape[0] != 0:
-            return True
-
-    for column in range(columns):
-        found = np.array(search_sequence_numpy(board_transposed[column], sequence))
-        if found.shape[0] != 0:
-            return True
-
-    for offset in range(-3, 3):
-        found = np.array(search_sequence_numpy(np.diag(board, k=offset), sequence))
-        if found.shape[0] != 0:
-            return True
-        else:
-            found = np.array(search_sequence_numpy(np.diag(board_flipped, k=offset), sequence))
-            if found.shape[0] != 0:
-                return True
-
-    return False
+    geometry = get_geometry(board.shape[0], board.shape[1], n)
+    if last_action is None:
+        windows = geometry.windows
+    else:
+        filled = np.flatnonzero(board[:, last_action] != NO_PLAYER)
+        if filled.size == 0:
+            return False
+        windows = geometry.cell_windows[filled[-1] * board.shape[1] + last_action]
+    return bool(np.any(np.all(board.ravel()[windows] == player, axis=1)))
 
 
 def check_end_state(
-        board: np.ndarray, player: BoardPiece, last_action: Optional[PlayerAction] = None,
+        board: np.ndarray, player: BoardPiece, last_action: Optional[PlayerAction] = None, n: int = CONNECT_N,
 ) -> GameState:
     """
     :param board: board that is going to be evaluated
     :param player: who's playing the current round
     :param last_action: If desired, the last action taken (i.e. last column played) can be provided
     for potential speed optimisation.
+    :param n: number of adjacent pieces needed to win, 4 by default
     :return: Returns the current game state for the current `player`, i.e. has their last
     action won (GameState.IS_WIN) or drawn (GameState.IS_DRAW) the game,
     or is play still on-going (GameState.STILL_PLAYING)?
     """
-    check = connected_four(board, player)
+    check = connected_four(board, player, last_action, n)
     if check:
         return GameState.IS_WIN
     else:
-        if len(np.where(board == 0)[0]) != 0:
+        if np.any(board == NO_PLAYER):
             return GameState.STILL_PLAYING
         else:
             return GameState.IS_DRAW
@@ -207,37 +300,17 @@ def connected_some(
     :param player: player for which we look for some sequence of 4 pieces, not necessarily 4 of the same, can be 3 of the same and one without a piece
     :param last_action: If desired, the last action taken (i.e. last column played) can be provided
     for potential speed optimisation.
-    :param sequence: sequence that we want to find in the board
+    :param sequence: sequence that we want to find in the board, its length is the length of the windows
     :return: True if there are four pieces equal to the sequence provided arranged
     in either a horizontal, vertical, or diagonal line. Returns False otherwise.
 
     """
-    board_transposed = board.T
-    board_flipped = np.flipud(board)
-    rows, columns = board.shape
-    sequence = player*sequence
-    shuffled_rows = np.arange(rows)
-    np.random.shuffle(shuffled_rows)
-    shuffled_columns = np.arange(columns)
-    np.random.shuffle(shuffled_columns)
-
-    for row in shuffled_rows:
-        found = np.array(search_sequence_numpy(board[row], sequence))
-        if found.shape[0] != 0:
-            return True
-
-    for column in shuffled_columns:
-        found = np.array(search_sequence_numpy(board_transposed[column], sequence))
-        if found.shape[0] != 0:
-            return True
-
-    for offset in range(-2, 2):
-        found = np.array(search_sequence_numpy(np.diag(board, k=offset), sequence))
-        if found.shape[0] != 0:
-            return True
-        else:
-            found = np.array(search_sequence_numpy(np.diag(board_flipped, k=offset), sequence))
-            if found.shape[0] != 0:
-                return True
-
-    return False
+    geometry = get_geometry(board.shape[0], board.shape[1], len(sequence))
+    if last_action is None:
+        windows = geometry.windows
+    else:
+        filled = np.flatnonzero(board[:, last_action] != NO_PLAYER)
+        if filled.size == 0:
+            return False
+        windows = geometry.cell_windows[filled[-1] * board.shape[1] + last_action]
+    return bool(np.any(np.all(board.ravel()[windows] == player * np.asarray(sequence), axis=1)))
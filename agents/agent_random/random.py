@@ -4,7 +4,8 @@ from typing import Optional, Tuple
 
 
 def generate_move_random(
-        board: np.ndarray, player: BoardPiece = None, saved_state: Optional[SavedState] = None
+        board: np.ndarray, player: BoardPiece = None, saved_state: Optional[SavedState] = None,
+        rng: Optional[np.random.Generator] = None
 ) -> Tuple[PlayerAction, Optional[SavedState]]:
     """
     :param board: current state of the board
@@ -14,6 +15,8 @@ def generate_move_random(
     Then in the process of choosing its first action,
     your agent might do a bunch of computation that it could reuse for future moves.
     Instead of just throwing that away, you can put it in an instance of your SavedState class'
+    :param rng: generator used to draw the move, e.g. np.random.default_rng(seed) to replay the same game,
+    the global np.random by default
 
     :return: move that the current player chose (randomly) and saved_state again,
     because it's not going to be used for now
@@ -22,6 +25,9 @@ def generate_move_random(
     # Choose a valid, non-full column randomly and return it as `action`
     # get all free columns from the board
     free_columns = np.array(np.unique(np.where(board == 0)[1]), dtype=PlayerAction)
-    action = np.random.choice(free_columns)
+    if rng is None:
+        action = np.random.choice(free_columns)
+    else:
+        action = rng.choice(free_columns)
 
     return action, saved_state
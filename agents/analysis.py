@@ -0,0 +1,295 @@
+"""
+Bulk analysis of positions with the alpha-beta agent.
+
+Positions are read as a stream, one record at a time, in any of these formats:
+- a pretty printed board (output of pretty_print_board, several lines starting with '|')
+- a move string, the columns played from the empty board, e.g. "3342"
+- a packed board (output of board_to_packed), e.g. 42 digits 0, 1 or 2 for a 6x7 board
+
+Each position is analyzed to a fixed depth, or by iterative deepening within a time limit,
+and the result is written as one JSON line with the best move, score, nodes and time.
+Searches are deterministic (seeded, see agents.search): the same input always gives the same moves
+and scores. With a cache, only results of searches of the same depth and seed are reused, so the moves
+and scores don't change, but the node counts and times do.
+
+usage: python -m agents.analysis positions.txt --depth 4 --workers 4 -o results.jsonl
+"""
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional, Union
+
+import numpy as np
+from agents.Common import BoardPiece, GameState, check_end_state, string_to_board, packed_to_board, moves_to_board
+from agents.Common import player_to_move, NO_PLAYER, PLAYER1, PLAYER2, ROWS, COLUMNS
+from agents.agent_minimax_prunning.minimax_with_prunning import DEPTH
+from agents.search import change_player, search
+from agents.cache import SearchCache
+from agents.tablebase import Tablebase
+
+FORMATS = ("auto", "pretty", "moves", "packed")
+
+_caches = {}  # SearchCache of this process for each cache file
+_tablebases = {}  # Tablebase of this process for each tablebase file
+
+
+def iter_records(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Split a stream of lines into position records, without reading the whole stream.
+    Pretty printed boards span several lines and end with the column numbers line,
+    every other non empty line is a record on its own. Incomplete boards are yielded as they are,
+    so that they are reported as invalid records. Lines starting with '#' are comments.
+    :param lines: lines of the input, e.g. an open file
+    :return: iterator over the records, in input order
+    """
+    board_lines = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.startswith("|"):
+            if line.startswith("|=") and board_lines and not board_lines[0].startswith("|="):
+                # stray lines before the top border of a board are a (malformed) record on their own
+                yield "\n".join(board_lines)
+                board_lines = []
+            board_lines.append(line)
+            if line.startswith("|0"):
+                yield "\n".join(board_lines)
+                board_lines = []
+        elif line.strip() and not line.lstrip().startswith("#"):
+            if board_lines:
+                yield "\n".join(board_lines)
+                board_lines = []
+            yield line.strip()
+    if board_lines:
+        yield "\n".join(board_lines)
+
+
+def record_format(record: str) -> str:
+    """
+    :param record: one position record
+    :return: the format of the record, 'pretty', 'moves' or 'packed'.
+    A move string can't be mistaken for a packed board: filling all the cells needs every column,
+    so a move string with as many moves as cells contains digits above 2.
+    """
+    if record.startswith("|"):
+        return "pretty"
+    if len(record) == 42 and set(record) <= set("012"):
+        return "packed"
+    return "moves"
+
+
+def record_to_board(record: str, fmt: str = "auto") -> np.ndarray:
+    """
+    :param record: one position record
+    :param fmt: format of the record, one of FORMATS
+    :return: the board described by the record
+    """
+    if fmt == "auto":
+        fmt = record_format(record)
+    if fmt == "pretty":
+        check_pretty_record(record)
+        board = string_to_board(record)
+    elif fmt == "packed":
+        board = packed_to_board(record)
+    elif fmt == "moves":
+        return moves_to_board(record)
+    else:
+        raise ValueError(f"unknown position format {fmt!r}")
+    check_board(board)
+    return board
+
+
+def check_pretty_record(record: str, rows: int = ROWS, columns: int = COLUMNS):
+    """
+    :param record: pretty printed board
+    :param rows: rows of the board
+    :param columns: columns of the board
+    :raise ValueError: if the record isn't a whole board of this shape: a border, `rows` rows
+    of the right width, a border and the column numbers line
+    """
+    lines = [line.rstrip() for line in record.splitlines()]
+    border = "|" + "=" * (2 * columns - 1) + "|"
+    if len(lines) != rows + 3 or lines[0] != border or lines[-2] != border or not lines[-1].startswith("|0"):
+        raise ValueError(f"the pretty printed board {record!r} isn't a whole {rows}x{columns} board")
+    for line in lines[1:-2]:
+        if len(line) != 2 * columns + 1 or not line.startswith("|") or not line.endswith("|"):
+            raise ValueError(f"{line!r} is not a row of a pretty printed {rows}x{columns} board")
+
+
+def check_board(board: np.ndarray):
+    """
+    :param board: board of a game where PLAYER1 moved first
+    :raise ValueError: if the board can't be reached by playing: wrong number of pieces of each player,
+    or pieces above an empty cell
+    """
+    difference = np.count_nonzero(board == PLAYER1) - np.count_nonzero(board == PLAYER2)
+    if difference not in (0, 1):
+        raise ValueError(f"impossible board, PLAYER1 has {difference} pieces more than PLAYER2")
+    if np.any((board[1:] != NO_PLAYER) & (board[:-1] == NO_PLAYER)):
+        raise ValueError("impossible board, a piece is floating above an empty cell")
+
+
+def analyze_position(board: np.ndarray, player: Optional[BoardPiece] = None, depth: Optional[int] = DEPTH,
+                     time_limit: Optional[float] = None, cache: Optional[SearchCache] = None, seed: int = 0,
+                     tablebase: Optional[Tablebase] = None) -> dict:
+    """
+    :param board: position to analyze
+    :param player: player to move, by default deduced from the number of pieces on the board
+    :param depth: maximum search depth, None to search until the time limit (or the end of the game)
+    :param time_limit: if given, search with iterative deepening and return the result
+    of the deepest search that finished within time_limit seconds
+    :param cache: optional persistent cache used by the search, only its results of searches of the same
+    depth are reused, so that the result doesn't depend on what was analyzed before
+    :param seed: seed of the evaluation of the leaves
+    :param tablebase: optional late-game tablebase probed by the search
+    :return: dictionary with the best move, its score, the depth reached, the number of nodes
+    visited and the time spent in seconds, plus the cache hits and misses if a cache is used
+    """
+    t0 = time.perf_counter()
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    if player is None:
+        player = player_to_move(board)
+    opponent = change_player(player)
+    result = {"player": int(player), "move": None, "score": None, "depth": 0, "nodes": 0}
+
+    if any(check_end_state(board, p) != GameState.STILL_PLAYING for p in (player, opponent)):
+        result["time"] = time.perf_counter() - t0
+        return result
+
+    move, utility, reached, nodes = search(board, player, depth, time_limit, cache=cache, seed=seed,
+                                           tablebase=tablebase, exact_depth=True)
+    if move is not None:
+        result.update(move=int(move), score=_json_score(utility), depth=reached)
+
+    result["nodes"] = nodes
+    if cache is not None:
+        result["cache_hits"] = cache.hits - hits
+        result["cache_misses"] = cache.misses - misses
+    result["time"] = time.perf_counter() - t0
+    return result
+
+
+def analyze_record(record: str, fmt: str = "auto", depth: Optional[int] = DEPTH,
+                   time_limit: Optional[float] = None, cache_path: Optional[str] = None, seed: int = 0,
+                   tablebase_path: Optional[str] = None) -> dict:
+    """
+    Parse and analyze one record. Invalid records don't stop the analysis, they produce an error entry.
+    :param record: one position record
+    :param fmt: format of the record, one of FORMATS
+    :param depth: see analyze_position
+    :param time_limit: see analyze_position
+    :param cache_path: optional SearchCache file, opened once per process and flushed after each record
+    :param seed: see analyze_position, results of different seeds are cached separately by the search
+    :param tablebase_path: optional tablebase file, memory mapped once per process, results found with
+    and without a tablebase are cached separately by the search
+    :return: output of analyze_position, with the record as 'position', or an 'error' entry
+    """
+    try:
+        board = record_to_board(record, fmt)
+    except ValueError as error:
+        return {"position": record, "error": str(error)}
+    tablebase = None
+    if tablebase_path is not None:
+        if tablebase_path not in _tablebases:
+            _tablebases[tablebase_path] = Tablebase(tablebase_path)
+        tablebase = _tablebases[tablebase_path]
+    cache = None
+    if cache_path is not None:
+        if cache_path not in _caches:
+            _caches[cache_path] = SearchCache(cache_path)
+        cache = _caches[cache_path]
+    result = {"position": record}
+    result.update(analyze_position(board, depth=depth, time_limit=time_limit, cache=cache, seed=seed,
+                                   tablebase=tablebase))
+    if cache is not None:
+        cache.flush()
+    return result
+
+
+def analyze_stream(records: Iterable[str], fmt: str = "auto", depth: Optional[int] = DEPTH,
+                   time_limit: Optional[float] = None, workers: int = 1,
+                   cache_path: Optional[str] = None, seed: int = 0,
+                   tablebase_path: Optional[str] = None) -> Iterator[dict]:
+    """
+    Analyze a stream of records, in parallel if workers > 1.
+    At most 2 * workers records are in flight at any time, so memory stays bounded for any input size,
+    and results are yielded in input order.
+    :param records: position records, e.g. from iter_records
+    :param fmt: see analyze_record
+    :param depth: see analyze_position
+    :param time_limit: see analyze_position
+    :param workers: number of processes
+    :param cache_path: see analyze_record
+    :param seed: see analyze_position
+    :param tablebase_path: see analyze_record
+    :return: iterator over the results of analyze_record
+    """
+    if workers <= 1:
+        for record in records:
+            yield analyze_record(record, fmt, depth, time_limit, cache_path, seed, tablebase_path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for record in records:
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+            pending.append(executor.submit(analyze_record, record, fmt, depth, time_limit, cache_path, seed,
+                                           tablebase_path))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _json_score(score) -> Union[float, str]:
+    """
+    :param score: utility returned by the search
+    :return: score that can be written in standard JSON, wins and losses become "inf" and "-inf"
+    """
+    if np.isinf(score):
+        return "inf" if score > 0 else "-inf"
+    return float(score)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m agents.analysis", description=__doc__.splitlines()[1])
+    parser.add_argument("input", help="file with one position per record, '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSON lines output file, '-' for stdout")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="auto", help="format of the positions")
+    parser.add_argument("-d", "--depth", type=int, default=None,
+                        help=f"search depth (default {DEPTH}, or unlimited with --time-limit)")
+    parser.add_argument("-t", "--time-limit", type=float, default=None,
+                        help="seconds per position, searched with iterative deepening")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="number of processes")
+    parser.add_argument("-c", "--cache", default=None, help="persistent search cache file (SQLite)")
+    parser.add_argument("-b", "--tablebase", default=None, help="late-game tablebase file (agents.tablebase)")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the evaluation of the leaves")
+    args = parser.parse_args(argv)
+
+    depth = args.depth
+    if depth is None and args.time_limit is None:
+        depth = DEPTH
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    sink = sys.stdout if args.output == "-" else open(args.output, "w")
+    hits = misses = 0
+    try:
+        for result in analyze_stream(iter_records(source), args.format, depth, args.time_limit, args.workers,
+                                     args.cache, args.seed, args.tablebase):
+            sink.write(json.dumps(result) + "\n")
+            sink.flush()
+            hits += result.get("cache_hits", 0)
+            misses += result.get("cache_misses", 0)
+        if args.cache is not None:
+            rate = hits / (hits + misses) if hits + misses else 0.0
+            print(f"cache: {hits} hits, {misses} misses, hit rate {rate:.1%}", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmark of the search engine configurations against the plain minimax baseline.
+
+Every configuration searches the same positions to the same depth, and we report
+the nodes visited, the time spent and the speed-up with respect to plain minimax.
+We also report the cold start time of a fresh interpreter loading each agent, and with
+--value-network the strength per CPU-second of the learned evaluator against calculate_utility.
+
+usage: python -m agents.benchmark --depth 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from agents.Common import BoardPiece, SavedState, PlayerAction, PLAYER1, PLAYER2, NO_PLAYER
+from agents.Common import ROWS, COLUMNS, CONNECT_N
+from agents.Common import moves_to_board, player_to_move
+from agents.registry import available_agents
+from agents.search import search, center_first, calculate_utility, Evaluator
+from agents.selfplay import play_game
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCH_POSITIONS = ("", "3", "33", "3342", "334422", "3344225")
+
+BASELINE = "minimax"
+CONFIGS = {
+    BASELINE: dict(pruning=False),
+    "alphabeta": dict(pruning=True),
+    "alphabeta+center": dict(pruning=True, orderer=center_first),
+}
+
+
+def benchmark_search(positions: Iterable[str] = BENCH_POSITIONS, configs: Optional[Dict[str, dict]] = None,
+                     depth: int = 3, rows: int = ROWS, columns: int = COLUMNS, n: int = CONNECT_N,
+                     seed: Optional[int] = 0) -> List[dict]:
+    """
+    :param positions: move strings of the positions to search
+    :param configs: SearchContext settings of each configuration, by name. The first one is the baseline.
+    :param depth: depth of all the searches
+    :param rows: rows of the board
+    :param columns: columns of the board
+    :param n: number of pieces in a row needed to win
+    :param seed: seed of the evaluation of the leaves, so that every configuration searches the same tree
+    and the node counts are reproducible, None for random tie-breaks
+    :return: one row per configuration with its name, nodes, time in seconds,
+    nodes per second and speed-up with respect to the baseline
+    """
+    if configs is None:
+        configs = CONFIGS
+    boards = [moves_to_board(moves, rows, columns) for moves in positions]
+    results = []
+    for name, settings in configs.items():
+        nodes = 0
+        t0 = time.perf_counter()
+        for board in boards:
+            nodes += search(board, player_to_move(board), depth, n=n, seed=seed, **settings).nodes
+        seconds = time.perf_counter() - t0
+        results.append({"name": name, "nodes": nodes, "time": seconds, "nodes_per_second": nodes / seconds})
+    for result in results:
+        result["speedup"] = results[0]["time"] / result["time"]
+    return results
+
+
+def format_rows(rows: List[dict]) -> str:
+    """
+    :param rows: output of benchmark_search
+    :return: rows as a table to print on the console
+    """
+    lines = [f"{'config':<20}{'nodes':>10}{'time [s]':>12}{'nodes/s':>12}{'speed-up':>10}"]
+    for row in rows:
+        lines.append(f"{row['name']:<20}{row['nodes']:>10}{row['time']:>12.3f}"
+                     f"{row['nodes_per_second']:>12.0f}{row['speedup']:>10.2f}")
+    return "\n".join(lines)
+
+
+def measure_cold_start(names: Optional[Iterable[str]] = None, repeat: int = 3) -> List[dict]:
+    """
+    Time fresh interpreters that only load one agent, as short-lived commands and workers do.
+    :param names: registered agents to load, by default all of them
+    :param repeat: number of runs of each command, the fastest one is reported
+    :return: one row per command with its name and time in seconds, starting with the bare
+    interpreter and the command line help as references
+    """
+    commands = {"python": "pass", "main.py --help": None}
+    for name in available_agents() if names is None else names:
+        commands[f"agent {name}"] = f"from agents.registry import load_agent; load_agent({name!r})"
+
+    rows = []
+    for name, code in commands.items():
+        arguments = [sys.executable, "main.py", "--help"] if code is None else [sys.executable, "-c", code]
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            subprocess.run(arguments, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - t0)
+        rows.append({"name": name, "time": min(times)})
+    return rows
+
+
+def format_cold_start(rows: List[dict]) -> str:
+    """
+    :param rows: output of measure_cold_start
+    :return: rows as a table to print on the console
+    """
+    lines = [f"{'cold start':<20}{'time [s]':>12}"]
+    for row in rows:
+        lines.append(f"{row['name']:<20}{row['time']:>12.3f}")
+    return "\n".join(lines)
+
+
+def _timed_agent(evaluator: Evaluator, depth: int, row: dict):
+    """
+    :return: generate_move function searching with `evaluator`, that adds its CPU time, moves and nodes to row
+    """
+    def generate_move(board, player: BoardPiece, saved_state: Optional[SavedState]) \
+            -> Tuple[PlayerAction, Optional[SavedState]]:
+        t0 = time.process_time()
+        result = search(board, player, depth, evaluator=evaluator)
+        row["cpu_time"] += time.process_time() - t0
+        row["moves"] += 1
+        row["nodes"] += result.nodes
+        return result.move, saved_state
+
+    return generate_move
+
+
+def benchmark_evaluators(evaluators: Dict[str, Evaluator], games: int = 4, depth: int = 2,
+                         openings: Iterable[str] = BENCH_POSITIONS) -> List[dict]:
+    """
+    Play games between two evaluators, both searching to the same depth with alpha beta pruning,
+    alternating who plays first and cycling through the openings.
+    :param evaluators: the two evaluators, by name
+    :param games: number of games
+    :param depth: search depth of both players
+    :param openings: move strings the games start from
+    :return: one row per evaluator with its points (1 per win, 0.5 per draw), CPU time in seconds,
+    moves, nodes and points per CPU-second
+    """
+    (name_1, evaluator_1), (name_2, evaluator_2) = evaluators.items()
+    rows = {name: {"name": name, "points": 0.0, "cpu_time": 0.0, "moves": 0, "nodes": 0} for name in evaluators}
+    agents = {name_1: _timed_agent(evaluator_1, depth, rows[name_1]),
+              name_2: _timed_agent(evaluator_2, depth, rows[name_2])}
+    openings = list(openings)
+    for game in range(games):
+        first, second = (name_1, name_2) if game % 2 == 0 else (name_2, name_1)
+        winner, _ = play_game(agents[first], agents[second], openings[(game // 2) % len(openings)])
+        if winner == NO_PLAYER:
+            rows[first]["points"] += 0.5
+            rows[second]["points"] += 0.5
+        else:
+            rows[{PLAYER1: first, PLAYER2: second}[winner]]["points"] += 1
+    for row in rows.values():
+        row["points_per_cpu_second"] = row["points"] / row["cpu_time"] if row["cpu_time"] else 0.0
+    return list(rows.values())
+
+
+def format_evaluators(rows: List[dict]) -> str:
+    """
+    :param rows: output of benchmark_evaluators
+    :return: rows as a table to print on the console
+    """
+    lines = [f"{'evaluator':<20}{'points':>8}{'cpu [s]':>10}{'moves':>8}{'nodes':>10}{'points/cpu s':>14}"]
+    for row in rows:
+        lines.append(f"{row['name']:<20}{row['points']:>8.1f}{row['cpu_time']:>10.2f}{row['moves']:>8}"
+                     f"{row['nodes']:>10}{row['points_per_cpu_second']:>14.3f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m agents.benchmark", description=__doc__.splitlines()[1])
+    parser.add_argument("-d", "--depth", type=int, default=3, help="search depth")
+    parser.add_argument("-c", "--config", action="append", choices=list(CONFIGS),
+                        help=f"configuration to run, can be repeated (default all, {BASELINE} is always run)")
+    parser.add_argument("--rows", type=int, default=ROWS, help="rows of the board")
+    parser.add_argument("--columns", type=int, default=COLUMNS, help="columns of the board")
+    parser.add_argument("-n", "--connect", type=int, default=CONNECT_N, help="pieces in a row needed to win")
+    parser.add_argument("--value-network", default=None,
+                        help="weights of a value network (agents.value_network) to play against calculate_utility")
+    parser.add_argument("--games", type=int, default=4, help="games played by the evaluators")
+    args = parser.parse_args(argv)
+
+    names = [BASELINE] + [name for name in args.config or CONFIGS if name != BASELINE]
+    configs = {name: CONFIGS[name] for name in names}
+    print(f"{args.rows}x{args.columns} board, connect {args.connect}, depth {args.depth}")
+    print(format_rows(benchmark_search(configs=configs, depth=args.depth, rows=args.rows, columns=args.columns,
+                                       n=args.connect)))
+    print()
+    print(format_cold_start(measure_cold_start()))
+    if args.value_network is not None:
+        from agents.value_network import ValueNetwork
+
+        evaluators = {"calculate_utility": calculate_utility, "value_network": ValueNetwork.load(args.value_network)}
+        print()
+        print(format_evaluators(benchmark_evaluators(evaluators, args.games, args.depth)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Boards as pairs of Python integers (bitboards), for the tools that walk huge numbers of positions
+(agents.perft, agents.tablebase), where copying ndarrays would dominate the cost.
+
+The layout is the one of Pascal Pons' Connect 4 solver: column c, row r (row 0 at the bottom)
+is bit c * (rows + 1) + r, with one spare bit on top of every column. A position is stored as
+- position: the pieces of the player to move
+- mask: all the pieces on the board
+so that playing a move is two integer operations and a board has the unique key position + mask.
+"""
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+from agents.Common import BoardPiece, NO_PLAYER, ROWS, COLUMNS, CONNECT_N
+
+
+class BitboardGeometry:
+    """
+    Masks of a board of shape (rows, columns) where n pieces in a row win
+    """
+
+    def __init__(self, rows: int = ROWS, columns: int = COLUMNS, n: int = CONNECT_N):
+        """
+        :param rows: rows of the board
+        :param columns: columns of the board
+        :param n: number of pieces in a row needed to win
+        """
+        self.rows = rows
+        self.columns = columns
+        self.n = n
+        self.height = rows + 1  # bits per column, with the spare bit
+        self.bottom = [1 << (column * self.height) for column in range(columns)]
+        self.top = [1 << (column * self.height + rows - 1) for column in range(columns)]
+        self.column_masks = [((1 << rows) - 1) << (column * self.height) for column in range(columns)]
+        self.board_mask = sum(self.column_masks)
+        # shifts between neighbours: vertical, horizontal and the two diagonals
+        self.shifts = (1, self.height, self.height - 1, self.height + 1)
+        # bit of every cell of the ndarray board, as Python integers so that any board size fits
+        self.cell_bits = np.array([[1 << (column * self.height + row) for column in range(columns)]
+                                   for row in range(rows)], dtype=object)
+
+    def from_board(self, board: np.ndarray, player: BoardPiece) -> Tuple[int, int]:
+        """
+        :param board: ndarray board of this geometry
+        :param player: player to move
+        :return: position (pieces of player) and mask (all the pieces) of the board
+        """
+        return int(self.cell_bits[board == player].sum()), int(self.cell_bits[board != NO_PLAYER].sum())
+
+    def to_board(self, position: int, mask: int, player: BoardPiece, opponent: BoardPiece) -> np.ndarray:
+        """
+        :return: ndarray board of a position where `player` is to move
+        """
+        board = np.zeros((self.rows, self.columns), dtype=BoardPiece)
+        for column in range(self.columns):
+            for row in range(self.rows):
+                bit = 1 << (column * self.height + row)
+                if mask & bit:
+                    board[row, column] = player if position & bit else opponent
+        return board
+
+    def legal_columns(self, mask: int) -> List[int]:
+        """
+        :return: columns that are not full
+        """
+        return [column for column in range(self.columns) if not mask & self.top[column]]
+
+    def play(self, position: int, mask: int, column: int) -> Tuple[int, int]:
+        """
+        :param column: a legal column
+        :return: position and mask after the player to move played in column,
+        the position being now the pieces of the other player
+        """
+        return position ^ mask, mask | (mask + self.bottom[column])
+
+    def is_win(self, pieces: int) -> bool:
+        """
+        :param pieces: pieces of one player
+        :return: True if n of them are in a row, horizontally, vertically or diagonally
+        """
+        for shift in self.shifts:
+            aligned = pieces
+            for i in range(1, self.n):
+                aligned &= pieces >> (i * shift)
+            if aligned:
+                return True
+        return False
+
+    def mirror(self, pieces: int) -> int:
+        """
+        :return: pieces (or mask) of the board mirrored left to right
+        """
+        mirrored = 0
+        for column in range(self.columns):
+            shift = (self.columns - 1 - 2 * column) * self.height
+            bits = pieces & self.column_masks[column]
+            mirrored |= bits << shift if shift >= 0 else bits >> -shift
+        return mirrored
+
+    def key(self, position: int, mask: int) -> int:
+        """
+        :return: key of the position, the same for a position and its mirror image,
+        which have the same game theoretic value
+        """
+        return min(position + mask, self.mirror(position) + self.mirror(mask))
+
+
+@lru_cache(maxsize=None)
+def get_bitboard_geometry(rows: int = ROWS, columns: int = COLUMNS, n: int = CONNECT_N) -> BitboardGeometry:
+    """
+    :return: the BitboardGeometry of a board of shape (rows, columns) where n pieces in a row win
+    """
+    return BitboardGeometry(rows, columns, n)
@@ -0,0 +1,211 @@
+"""
+Persistent search result cache, shared across runs and processes.
+
+Results of maximize/minimize are stored in an SQLite file, keyed by position, player and node type,
+together with the depth they were searched to. A result is only reused for searches of the same
+or a smaller depth. The database is opened in WAL mode, so any number of processes can read and
+write the same file at the same time, each one with its own SearchCache.
+"""
+import os
+import sqlite3
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+from agents.Common import BoardPiece, PlayerAction, board_to_packed, EXACT, LOWER, UPPER
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    flag INTEGER NOT NULL,
+    score REAL NOT NULL,
+    move INTEGER,
+    used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+
+class SearchCache:
+    """
+    Depth qualified scores and best moves of searched positions, stored on disk.
+    Writes are buffered and flushed in one transaction every `flush_every` writes (and on close),
+    and the least recently used entries are evicted when the file holds more than `max_entries`.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1_000_000, namespace: str = "", flush_every: int = 1000,
+                 timeout: float = 30.0):
+        """
+        :param path: SQLite file, created if it doesn't exist
+        :param max_entries: size cap of the cache, in number of positions
+        :param namespace: prefix of all the keys, so that searches with different settings
+        (e.g. evaluators) can share a file without mixing their results
+        :param flush_every: number of buffered writes after which they are written to the file
+        :param timeout: seconds to wait for other processes holding a lock on the file
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self.flush_every = flush_every
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._pending = {}
+        self._used = set()
+        self._connection = None
+        self._pid = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        Connection to the file, opened lazily and reopened in forked processes,
+        since SQLite connections can't be shared across processes.
+        """
+        if self._connection is None or self._pid != os.getpid():
+            if self._pid is not None and self._pid != os.getpid():
+                # the buffers were inherited from the parent process, which will write them itself
+                self._pending = {}
+                self._used = set()
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._connection
+
+    def key(self, board: np.ndarray, agent: BoardPiece, maximizing: bool, depth: Optional[int] = None,
+            scope: str = "") -> str:
+        """
+        :param board: searched position
+        :param agent: player for whom the utility is maximized
+        :param maximizing: True for maximize nodes, False for minimize nodes
+        :param depth: remaining depth, part of the key for exact depth entries, None otherwise
+        :param scope: settings of the search that change its results (see SearchContext.scope),
+        added to the namespace
+        :return: key of the position in the cache
+        """
+        namespace = ",".join(part for part in (self.namespace, scope) if part)
+        key = f"{namespace}:{board_to_packed(board)}:{int(agent)}:{'max' if maximizing else 'min'}"
+        return key if depth is None else f"{key}:{int(depth)}"
+
+    def get(self, board: np.ndarray, agent: BoardPiece, maximizing: bool, depth: int, exact_depth: bool = False,
+            scope: str = "") -> Optional[Tuple[int, float, Optional[PlayerAction]]]:
+        """
+        :param board: searched position
+        :param agent: player for whom the utility is maximized
+        :param maximizing: True for maximize nodes, False for minimize nodes
+        :param depth: remaining depth of the search at this position
+        :param exact_depth: only reuse a search of exactly `depth`, stored with put(..., exact_depth=True),
+        so that the result doesn't depend on what deeper searches stored before
+        :param scope: see key
+        :return: flag (EXACT, LOWER or UPPER), score and best move of a search of at least `depth`
+        (exactly `depth` with exact_depth), None if there isn't one in the cache
+        """
+        key = self.key(board, agent, maximizing, depth if exact_depth else None, scope)
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self.connection.execute(
+                "SELECT depth, flag, score, move FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if entry is None or entry[0] < depth:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.add(key)
+        _, flag, score, move = entry
+        return flag, score, None if move is None else PlayerAction(move)
+
+    def put(self, board: np.ndarray, agent: BoardPiece, maximizing: bool, depth: int, flag: int, score: float,
+            move: Optional[PlayerAction], exact_depth: bool = False, scope: str = ""):
+        """
+        Store the result of a search, unless a deeper one is already stored.
+        With exact_depth, the result is stored for searches of this depth only, next to the other depths.
+        :param board: searched position
+        :param agent: player for whom the utility is maximized
+        :param maximizing: True for maximize nodes, False for minimize nodes
+        :param depth: remaining depth of the search at this position
+        :param flag: EXACT, LOWER or UPPER
+        :param score: utility found by the search
+        :param move: best move found by the search
+        :param exact_depth: see get
+        :param scope: see key
+        """
+        key = self.key(board, agent, maximizing, depth if exact_depth else None, scope)
+        previous = self._pending.get(key)
+        if previous is not None and previous[0] > depth:
+            return
+        self._pending[key] = (int(depth), int(flag), float(score), None if move is None else int(move))
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered results and access times to the file, then evict entries above the size cap
+        """
+        if not self._pending and not self._used:
+            return
+        now = time.time()
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.executemany(
+                "INSERT INTO results (key, depth, flag, score, move, used) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET depth = excluded.depth, flag = excluded.flag, "
+                "score = excluded.score, move = excluded.move, used = excluded.used "
+                "WHERE excluded.depth >= results.depth",
+                [(key,) + entry + (now,) for key, entry in self._pending.items()]
+            )
+            written = cursor.rowcount  # without the results that weren't deeper than the stored ones
+            connection.executemany("UPDATE results SET used = ? WHERE key = ?",
+                                   [(now, key) for key in self._used])
+            excess = connection.execute("SELECT count(*) FROM results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                # evict a bit more than needed, so that we don't have to evict again at the next flush
+                excess += self.max_entries // 10
+                cursor = connection.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY used LIMIT ?)", (excess,)
+                )
+                self.evictions += cursor.rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self.writes += written
+        self._pending = {}
+        self._used = set()
+
+    def close(self):
+        """
+        Flush the buffered results and close the file
+        """
+        if self._connection is not None and self._pid == os.getpid():
+            self.flush()
+            self._connection.close()
+        self._connection = None
+
+    def __len__(self) -> int:
+        """
+        :return: number of positions in the file, after writing the buffered results
+        (which can be new positions or update stored ones)
+        """
+        self.flush()
+        return self.connection.execute("SELECT count(*) FROM results").fetchone()[0]
+
+    def stats(self) -> dict:
+        """
+        :return: hits, misses, hit rate, writes and evictions of this process since the cache was opened,
+        after writing the buffered results
+        """
+        self.flush()
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                "writes": self.writes, "evictions": self.evictions}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,291 @@
+"""
+Distributed self-play: a coordinator hands out games to workers over TCP.
+
+The protocol is one JSON object per line. A worker asks for a job with {"type": "job"} and the
+coordinator answers with a job (agents, opening, seed), {"type": "wait"} if all the remaining jobs
+are being played by other workers, or {"type": "done"}. The worker plays the game headlessly and
+sends back {"type": "result", "id": ..., "winner": ..., "moves": ...}, acknowledged with {"type": "ok"}.
+
+- Workers pull one job at a time, and the coordinator only acknowledges a result once there is room
+  for it in its bounded result queue, so slow consumers throttle the workers (backpressure).
+- Jobs are leased: if a worker disconnects, or doesn't send a result within the lease timeout,
+  the job is handed out again, up to max_attempts times.
+- Jobs are read lazily from an iterator, so the coordinator's memory doesn't grow with their number.
+
+usage:
+    python main.py selfplay alphabeta random -n 100 --listen 0.0.0.0:5555 -o games.jsonl
+    python main.py worker coordinator-host:5555        (on every node, as many times as cores)
+"""
+import json
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from typing import Iterable, Iterator, Optional, Tuple
+
+_DONE = object()  # marks the end of the results
+
+
+def _send(stream, message: dict):
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+
+def _receive(stream) -> Optional[dict]:
+    """
+    :return: next message of the stream, None if the other side disconnected
+    """
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def selfplay_jobs(agent_1: str, agent_2: str, games: int, opening: str = "", seed: int = 0) -> Iterator[dict]:
+    """
+    :return: jobs for `games` games between two registered agents, alternating who plays first,
+    each one with its own seed
+    """
+    for game in range(games):
+        first, second = (agent_1, agent_2) if game % 2 == 0 else (agent_2, agent_1)
+        yield {"agent_1": first, "agent_2": second, "opening": opening, "seed": seed + game}
+
+
+class Coordinator:
+    """
+    TCP server handing out jobs to workers and collecting their results
+    """
+
+    def __init__(self, jobs: Iterable[dict], host: str = "127.0.0.1", port: int = 0, lease_timeout: float = 600.0,
+                 max_attempts: int = 3, max_pending_results: int = 64):
+        """
+        :param jobs: jobs to play, dictionaries with agent_1, agent_2, opening and seed
+        :param host: address to listen on
+        :param port: port to listen on, 0 for any free port
+        :param lease_timeout: seconds after which a job without result is handed out again
+        :param max_attempts: number of times a job is handed out before it's reported as failed
+        :param max_pending_results: results that can wait to be consumed before workers are throttled
+        """
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self._jobs = iter(jobs)
+        self._next_job = next(self._jobs, None)
+        self._issued = 0
+        self._delivered = 0
+        self._finished = False  # _DONE was queued
+        self._retry = deque()
+        self._leases = {}  # job id -> (job, lease deadline)
+        self._attempts = {}
+        self._done = set()
+        self._lock = threading.Lock()
+        self._results = queue.Queue(maxsize=max_pending_results)
+        if self._next_job is None:
+            self._finished = True
+            self._results.put(_DONE)
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                coordinator._serve(self.rfile, self.wfile)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """
+        :return: host and port the workers should connect to
+        """
+        return self._server.server_address[:2]
+
+    def results(self) -> Iterator[dict]:
+        """
+        :return: iterator over the results, in the order they arrive, until all the jobs are done.
+        Each result is the job with the id, winner and moves of the game, or an "error" entry
+        if the job failed max_attempts times.
+        """
+        while True:
+            result = self._results.get()
+            if result is _DONE:
+                return
+            yield result
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _serve(self, rfile, wfile):
+        """
+        Talk to one worker until it disconnects, then hand out again the jobs it didn't finish
+        """
+        leased = set()
+        reader = (line.decode() for line in iter(rfile.readline, b""))
+        try:
+            for line in reader:
+                message = json.loads(line)
+                if message["type"] == "job":
+                    reply = self._lease()
+                    if reply["type"] == "job":
+                        leased.add(reply["id"])
+                elif message["type"] == "result":
+                    leased.discard(message["id"])
+                    if self._complete(message):
+                        reply = {"type": "ok"}
+                    else:
+                        reply = {"type": "error", "error": f"unknown job id {message['id']!r}"}
+                else:
+                    reply = {"type": "error", "error": f"unknown message type {message['type']!r}"}
+                wfile.write((json.dumps(reply) + "\n").encode())
+                wfile.flush()
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            self._release(leased, "worker disconnected")
+
+    def _lease(self) -> dict:
+        """
+        :return: next job for a worker, with its id, or a wait or done message
+        """
+        expired = []
+        with self._lock:
+            now = time.monotonic()
+            for job_id, (job, deadline) in list(self._leases.items()):
+                if deadline < now:
+                    expired.append(job_id)
+        self._release(expired, "lease expired")
+
+        with self._lock:
+            if self._retry:
+                job = self._retry.popleft()
+            elif self._next_job is not None:
+                job = dict(self._next_job, id=self._issued)
+                self._issued += 1
+                self._next_job = next(self._jobs, None)
+            elif self._leases:
+                return {"type": "wait"}
+            else:
+                return {"type": "done"}
+            self._attempts[job["id"]] = self._attempts.get(job["id"], 0) + 1
+            self._leases[job["id"]] = (job, time.monotonic() + self.lease_timeout)
+            return dict(job, type="job")
+
+    def _release(self, job_ids: Iterable[int], reason: str):
+        """
+        Hand out again the unfinished jobs among job_ids, or report them as failed
+        """
+        failed = []
+        with self._lock:
+            for job_id in job_ids:
+                if job_id not in self._leases:
+                    continue
+                job, _ = self._leases.pop(job_id)
+                if self._attempts[job_id] < self.max_attempts:
+                    self._retry.append(job)
+                else:
+                    self._done.add(job_id)
+                    failed.append(dict(job, error=f"{reason} {self._attempts[job_id]} times"))
+        for result in failed:
+            self._deliver(result)
+
+    def _complete(self, message: dict) -> bool:
+        """
+        Record the result of a job, unless it was already received from another worker
+        :return: False if the job id was never issued, True otherwise
+        """
+        with self._lock:
+            if message["id"] in self._done:
+                return True
+            job, _ = self._leases.pop(message["id"], (None, None))
+            if job is None:
+                # the lease had expired and the job was waiting to be handed out again
+                job = next((j for j in self._retry if j["id"] == message["id"]), None)
+                if job is None:
+                    return False
+                self._retry.remove(job)
+            self._done.add(message["id"])
+        self._deliver(dict(job, winner=message["winner"], moves=message["moves"]))
+        return True
+
+    def _deliver(self, result: dict):
+        """
+        Queue a result for the consumer, blocking while the queue is full, and mark the end of the results
+        once the result of every job has been queued
+        """
+        self._results.put(result)
+        with self._lock:
+            self._delivered += 1
+            if not self._finished and self._next_job is None and self._delivered == self._issued:
+                self._finished = True
+                self._results.put(_DONE)
+
+
+def play_job(job: dict) -> dict:
+    """
+    :param job: job received from the coordinator
+    :return: result message with the winner and moves of the game
+    """
+    import numpy as np
+    from agents.registry import load_agent
+    from agents.selfplay import play_game
+
+    np.random.seed(job["seed"])
+    winner, moves = play_game(load_agent(job["agent_1"]), load_agent(job["agent_2"]), job["opening"])
+    return {"type": "result", "id": job["id"], "winner": int(winner), "moves": moves}
+
+
+def run_worker(host: str, port: int, wait: float = 0.5, connect_timeout: float = 30.0,
+               max_jobs: Optional[int] = None) -> int:
+    """
+    Play the games handed out by a coordinator until it has no more jobs.
+    :param host: host of the coordinator
+    :param port: port of the coordinator
+    :param wait: seconds to wait before asking again when all the remaining jobs are taken
+    :param connect_timeout: seconds during which we keep trying to connect, e.g. while the coordinator starts
+    :param max_jobs: stop after this many games, None to play until the coordinator is done
+    :return: number of games played
+    """
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+    played = 0
+    with connection, connection.makefile("rw") as stream:
+        while max_jobs is None or played < max_jobs:
+            _send(stream, {"type": "job"})
+            reply = _receive(stream)
+            if reply is None or reply["type"] == "done":
+                break
+            if reply["type"] == "wait":
+                time.sleep(wait)
+                continue
+            _send(stream, play_job(reply))
+            if _receive(stream) is None:
+                break
+            played += 1
+    return played
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    :param address: "host:port"
+    :return: host and port
+    """
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
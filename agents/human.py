@@ -0,0 +1,34 @@
+"""
+Human player: reads the moves from the console. Registered as the "human" agent in agents.registry.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    from agents.Common import PlayerAction, BoardPiece, SavedState
+
+
+def user_move(board: np.ndarray, _player: BoardPiece, saved_state: Optional[SavedState]) -> Tuple[
+    PlayerAction, Optional[SavedState]]:
+    """
+
+    :param board: current state of the board
+    :param _player: which player the user is
+    :param saved_state: The idea is that the first time in a game that generate_move is called,
+    the value of that argument is None.
+    Then in the process of choosing its first action,
+    your agent might do a bunch of computation that it could reuse for future moves.
+    Instead of just throwing that away, you can put it in an instance of your SavedState class'
+    :return: move that the current player chose and saved_state again, because it's not going to be used for now
+    """
+    from agents.Common import PlayerAction
+
+    action = PlayerAction(-1)
+    while not 0 <= action < board.shape[1]:
+        try:
+            action = PlayerAction(input("Column? "))
+        except ValueError:
+            print("Input could not be converted to the dtype PlayerAction, try entering an integer.")
+    return action, saved_state
@@ -0,0 +1,184 @@
+"""
+Perft: count the positions reached after exactly `depth` moves, to check that a board backend
+generates the right game tree and to measure its speed on its own, without any evaluation.
+
+Finished games are not expanded: a position where the last move connected four (n) has no children,
+so it is only counted if it's at the full depth. The counts from the empty 6x7 board are stored in
+REFERENCE_COUNTS, and every backend must agree with them and with each other.
+
+Backends are the board backends of the search engine (agents.search.BACKENDS), plus "bitboard"
+(agents.bitboard). The root moves can be counted in parallel processes.
+
+usage: python -m agents.perft --depth 7 --backend numpy --backend bitboard --workers 4
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from agents.Common import BoardPiece, GameState, PlayerAction, ROWS, COLUMNS, CONNECT_N
+from agents.Common import apply_player_action, moves_to_board, player_to_move
+from agents.bitboard import BitboardGeometry, get_bitboard_geometry
+from agents.search import BACKENDS, change_player
+
+BITBOARD = "bitboard"
+# positions after 0, 1, 2, ... moves from the empty 6x7 board, connect four
+REFERENCE_COUNTS = (1, 7, 49, 343, 2401, 16807, 117649, 823536, 5673234)
+
+
+def perft_backends() -> List[str]:
+    """
+    :return: names of the backends perft can count with
+    """
+    return list(BACKENDS) + [BITBOARD]
+
+
+def _perft_array(board: np.ndarray, player: BoardPiece, depth: int, backend, n: int) -> int:
+    if depth == 0:
+        return 1
+    moves, children = backend.children(board, player)
+    if depth == 1:
+        return len(moves)
+    opponent = change_player(player)
+    count = 0
+    for child in children:
+        if backend.end_state(child, player, n) == GameState.STILL_PLAYING:
+            count += _perft_array(child, opponent, depth - 1, backend, n)
+    return count
+
+
+def _perft_bits(geometry: BitboardGeometry, position: int, mask: int, depth: int) -> int:
+    if depth == 0:
+        return 1
+    columns = geometry.legal_columns(mask)
+    if depth == 1:
+        return len(columns)
+    count = 0
+    for column in columns:
+        next_position, next_mask = geometry.play(position, mask, column)
+        if not geometry.is_win(next_mask ^ next_position):
+            count += _perft_bits(geometry, next_position, next_mask, depth - 1)
+    return count
+
+
+def perft(board: np.ndarray, player: BoardPiece, depth: int, backend: str = "numpy", n: int = CONNECT_N) -> int:
+    """
+    :param board: root position, its end state is not checked
+    :param player: player to move at the root
+    :param depth: number of moves
+    :param backend: one of perft_backends()
+    :param n: number of pieces in a row needed to win
+    :return: number of positions reached after exactly depth moves, without going through finished games
+    """
+    if backend == BITBOARD:
+        geometry = get_bitboard_geometry(board.shape[0], board.shape[1], n)
+        return _perft_bits(geometry, *geometry.from_board(board, player), depth)
+    return _perft_array(board, player, depth, BACKENDS[backend], n)
+
+
+def _perft_move(board: np.ndarray, player: BoardPiece, move: PlayerAction, depth: int, backend: str, n: int) -> int:
+    """
+    :return: perft count below one root move, run in a worker process by divide
+    """
+    if depth == 1:
+        return 1
+    if backend == BITBOARD:
+        geometry = get_bitboard_geometry(board.shape[0], board.shape[1], n)
+        position, mask = geometry.play(*geometry.from_board(board, player), int(move))
+        if geometry.is_win(mask ^ position):
+            return 0
+        return _perft_bits(geometry, position, mask, depth - 1)
+    child = apply_player_action(board, move, player, copy=True)
+    if BACKENDS[backend].end_state(child, player, n) != GameState.STILL_PLAYING:
+        return 0
+    return _perft_array(child, change_player(player), depth - 1, BACKENDS[backend], n)
+
+
+def divide(board: np.ndarray, player: BoardPiece, depth: int, backend: str = "numpy", n: int = CONNECT_N,
+           workers: int = 1) -> Dict[int, int]:
+    """
+    :param board: root position
+    :param player: player to move at the root
+    :param depth: number of moves, at least 1
+    :param backend: one of perft_backends()
+    :param n: number of pieces in a row needed to win
+    :param workers: number of processes, the root moves are split among them
+    :return: perft count below each legal root move, their sum is perft(board, player, depth)
+    """
+    moves = [PlayerAction(move) for move in np.flatnonzero(board[-1] == 0)]
+    args = [(board, player, move, depth, backend, n) for move in moves]
+    if workers <= 1:
+        counts = [_perft_move(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(_perft_move, *zip(*args)))
+    return {int(move): count for move, count in zip(moves, counts)}
+
+
+def run(moves: str = "", depths: Iterable[int] = range(1, 6), backends: Optional[Iterable[str]] = None,
+        workers: int = 1, rows: int = ROWS, columns: int = COLUMNS, n: int = CONNECT_N) -> List[dict]:
+    """
+    :param moves: move string of the root position, e.g. "3342"
+    :param depths: depths to count, at least 1
+    :param backends: backends to count with, all of them by default
+    :param workers: number of processes
+    :param rows: rows of the board
+    :param columns: columns of the board
+    :param n: number of pieces in a row needed to win
+    :return: one row per backend and depth with the count, time in seconds, nodes per second,
+    the reference count and whether the count is correct. Without a stored reference count,
+    the count of the first backend is the reference.
+    """
+    board = moves_to_board(moves, rows, columns)
+    player = player_to_move(board)
+    standard = moves == "" and (rows, columns, n) == (ROWS, COLUMNS, CONNECT_N)
+    results = []
+    for depth in depths:
+        reference = REFERENCE_COUNTS[depth] if standard and depth < len(REFERENCE_COUNTS) else None
+        for backend in backends or perft_backends():
+            t0 = time.perf_counter()
+            count = sum(divide(board, player, depth, backend, n, workers).values())
+            seconds = time.perf_counter() - t0
+            if reference is None:
+                reference = count
+            results.append({"backend": backend, "depth": depth, "nodes": count, "time": seconds,
+                             "nodes_per_second": count / seconds if seconds else float("inf"),
+                             "reference": reference, "ok": count == reference})
+    return results
+
+
+def format_rows(rows: List[dict]) -> str:
+    """
+    :param rows: output of run
+    :return: rows as a table to print on the console
+    """
+    lines = [f"{'backend':<12}{'depth':>6}{'nodes':>12}{'time [s]':>12}{'nodes/s':>12}  check"]
+    for row in rows:
+        check = "ok" if row["ok"] else f"MISMATCH, expected {row['reference']}"
+        lines.append(f"{row['backend']:<12}{row['depth']:>6}{row['nodes']:>12}{row['time']:>12.3f}"
+                     f"{row['nodes_per_second']:>12.0f}  {check}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m agents.perft", description=__doc__.splitlines()[1])
+    parser.add_argument("-d", "--depth", type=int, default=5, help="count every depth from 1 to this one")
+    parser.add_argument("-b", "--backend", action="append", choices=perft_backends(),
+                        help="backend to count with, can be repeated (default: all)")
+    parser.add_argument("-m", "--moves", default="", help="moves of the root position, e.g. 3342")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="number of processes")
+    parser.add_argument("--rows", type=int, default=ROWS, help="rows of the board")
+    parser.add_argument("--columns", type=int, default=COLUMNS, help="columns of the board")
+    parser.add_argument("-n", "--connect", type=int, default=CONNECT_N, help="pieces in a row needed to win")
+    args = parser.parse_args(argv)
+
+    rows = run(args.moves, range(1, args.depth + 1), args.backend, args.workers, args.rows, args.columns,
+               args.connect)
+    print(format_rows(rows))
+    return 0 if all(row["ok"] for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Registry of the agents, resolved by name.
+
+Agents are registered as "module:function" strings and only imported the first time they are
+requested, so that short-lived commands don't pay for importing agents (and their dependencies)
+they don't use. This module must not import numpy or any agent at import time.
+"""
+import importlib
+from typing import Dict, List
+
+AGENTS: Dict[str, str] = {
+    "random": "agents.agent_random:generate_move",
+    "minimax": "agents.agent_minimax:generate_move_minimax",
+    "alphabeta": "agents.agent_minimax_prunning:generate_move_minimax_pruning",
+    "human": "agents.human:user_move",
+}
+
+_loaded = {}
+
+
+def register_agent(name: str, target: str):
+    """
+    :param name: name by which the agent is requested
+    :param target: "module:function" path of its generate_move function
+    """
+    if ":" not in target:
+        raise ValueError(f"agent target {target!r} should be of the form 'module:function'")
+    AGENTS[name] = target
+    _loaded.pop(name, None)
+
+
+def available_agents() -> List[str]:
+    """
+    :return: names of the registered agents
+    """
+    return sorted(AGENTS)
+
+
+def load_agent(name: str):
+    """
+    :param name: name of a registered agent
+    :return: its generate_move function (a GenMove), importing its module if needed
+    """
+    if name not in _loaded:
+        if name not in AGENTS:
+            raise KeyError(f"unknown agent {name!r}, choose one of {', '.join(available_agents())}")
+        module_name, function_name = AGENTS[name].split(":")
+        _loaded[name] = getattr(importlib.import_module(module_name), function_name)
+    return _loaded[name]
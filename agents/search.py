@@ -0,0 +1,471 @@
+"""
+Minimax search engine shared by all the minimax agents.
+
+One implementation of maximize/minimize, configured through a SearchContext:
+- pruning: alpha beta pruning on or off (plain minimax)
+- depth and deadline: where the tree is cut, and when the search is aborted
+- evaluator: utility of the leaves, calculate_utility by default. Evaluators with an
+  evaluate_batch(boards, agent, opponent) method (e.g. agents.value_network.ValueNetwork)
+  evaluate all the leaf children of a node in one call.
+- orderer: order in which the children of a node are searched
+- backend: how children and end states are computed from a board
+- n: number of pieces in a row needed to win, boards can have any shape
+- seed: None for the original random tie-break of calculate_utility, or an int for a deterministic
+  search, where the same position and settings always give the same move, utility and node count
+  without a cache (needed for the benchmarks to be meaningful)
+- cache: optional persistent SearchCache. Results are stored under the settings that change them
+  (n, seed, evaluator and tablebase, see SearchContext.cache_scope), and seeded searches only reuse results
+  of searches of the same depth (exact_depth), so that they find the same utility with or without
+  a cache, only with fewer nodes
+- tablebase: optional late-game agents.tablebase.Tablebase, probed at every node below the root
+  before it's evaluated or searched, exact results replace the whole subtree
+
+agent_minimax and agent_minimax_prunning are thin wrappers around this module, so that every
+speed-up lands in both and can be benchmarked against plain minimax (see agents.benchmark).
+"""
+from __future__ import annotations
+
+import time
+from functools import lru_cache, partial
+import numpy as np
+from typing import TYPE_CHECKING, Callable, NamedTuple, Optional, Tuple
+from agents.Common import BoardPiece, PlayerAction, GameState, NO_PLAYER, PLAYER1, PLAYER2, CONNECT_N
+from agents.Common import apply_player_action, check_end_state, get_geometry, EXACT, LOWER, UPPER, WIN, DRAW
+
+if TYPE_CHECKING:
+    # only the callers that use a cache or a tablebase load them (sqlite3, agents.bitboard)
+    from agents.cache import SearchCache
+    from agents.tablebase import Tablebase
+
+DEPTH = BoardPiece(5)
+
+Evaluator = Callable[[np.ndarray, BoardPiece, BoardPiece], float]  # (board, agent, opponent) -> utility
+MoveOrderer = Callable[[np.ndarray, np.ndarray, BoardPiece], np.ndarray]  # (moves, children, player) -> order
+
+
+def board_children(board: np.ndarray, player: BoardPiece) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find all board children by applying all available actions into a temporary board,
+    which is a copy of the one given as parent
+    :param player: current player
+    :param board: parent board
+    :return: available columns and all board children
+    """
+    free_columns = np.flatnonzero(board[-1] == NO_PLAYER).astype(PlayerAction)
+    children = np.zeros((len(free_columns),) + board.shape, dtype=BoardPiece)
+    for i in range(len(free_columns)):
+        children[i] = apply_player_action(board, action=free_columns[i], player=player, copy=True)
+    return free_columns, children
+
+
+def change_player(player: BoardPiece) -> BoardPiece:
+    """
+    :param player: current player
+    :return: the other possible player
+    """
+    if player == PLAYER1:
+        return PLAYER2
+    if player == PLAYER2:
+        return PLAYER1
+
+
+@lru_cache(maxsize=None)
+def _noise_table(seed: int, cells: int) -> np.ndarray:
+    """
+    :return: one random 62 bits number per cell and piece, shape (3, cells), for board_noise
+    """
+    return np.random.default_rng(seed).integers(0, 2 ** 62, size=(3, cells), dtype=np.int64)
+
+
+def board_noise(board: np.ndarray, seed: int, high: int = 6) -> int:
+    """
+    Deterministic replacement of np.random.randint(0, high): the same board and seed always give the same
+    number, whatever the order in which boards are visited, so transpositions and cached results agree.
+    :param board: board for which the number is drawn
+    :param seed: seed of the numbers, different seeds give different (uncorrelated) numbers
+    :param high: upper bound (exclusive) of the number
+    :return: a pseudo random number between 0 and high - 1, the XOR of one random number per piece
+    on the board (Zobrist hashing)
+    """
+    cells = board.ravel()
+    table = _noise_table(seed, cells.size)
+    return int(np.bitwise_xor.reduce(table[cells, np.arange(cells.size)]) % high)
+
+
+def calculate_utility(board: np.ndarray, agent: BoardPiece, opponent: BoardPiece, n: int = CONNECT_N,
+                      seed: Optional[int] = None) -> float:
+    """
+    :param board: board for which utility is being calculated
+    :param agent: player for whom utility is being maximized
+    :param opponent: opponent player for whom utility is being minimized
+    :param n: number of pieces in a row needed to win
+    :param seed: None to break ties with the global np.random, otherwise with board_noise(board, seed)
+    :return: utility of the board given, considering max utility as winning, minimum utility as loosing
+    and intermediate values for sequences with 3 (n - 1) pieces in a row
+    """
+    cells = board.ravel()[get_geometry(board.shape[0], board.shape[1], n).windows]
+    agent_pieces = np.count_nonzero(cells == agent, axis=1)
+    opponent_pieces = np.count_nonzero(cells == opponent, axis=1)
+
+    if np.any(opponent_pieces == n):
+        return -np.inf
+
+    if np.any(agent_pieces == n):
+        return np.inf
+
+    # the opponent has a window with n - 1 pieces and one empty cell left
+    if np.any((opponent_pieces == n - 1) & (agent_pieces == 0)):
+        return -18
+
+    if seed is None:
+        utility = np.random.randint(0, 6)
+    else:
+        utility = board_noise(board, seed)
+
+    return utility
+
+
+def natural_order(moves: np.ndarray, children: np.ndarray, player: BoardPiece) -> np.ndarray:
+    """
+    :return: indices of the children, searched from the leftmost column to the rightmost one
+    """
+    return np.arange(len(moves))
+
+
+def center_first(moves: np.ndarray, children: np.ndarray, player: BoardPiece) -> np.ndarray:
+    """
+    :return: indices of the children, searched from the central column outwards, since central
+    moves take part in more lines and are usually better, which leads to earlier cut-offs
+    """
+    center = (children.shape[2] - 1) / 2
+    return np.argsort(np.abs(moves - center), kind="stable")
+
+
+class NumpyBackend:
+    """
+    Boards as ndarrays, with the primitives from agents.Common
+    """
+    name = "numpy"
+
+    @staticmethod
+    def children(board: np.ndarray, player: BoardPiece) -> Tuple[np.ndarray, np.ndarray]:
+        return board_children(board, player)
+
+    @staticmethod
+    def end_state(board: np.ndarray, player: BoardPiece, n: int = CONNECT_N) -> GameState:
+        return check_end_state(board, player, n=n)
+
+
+BACKENDS = {NumpyBackend.name: NumpyBackend()}
+ORDERERS = {"natural": natural_order, "center": center_first}
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search tree when the deadline of a SearchContext has passed
+    """
+    pass
+
+
+class SearchContext:
+    """
+    Settings and counters shared by all the nodes visited during one search
+    """
+
+    def __init__(self, depth: int = DEPTH, deadline: Optional[float] = None, cache: Optional[SearchCache] = None,
+                 pruning: bool = True, evaluator: Optional[Evaluator] = None,
+                 orderer: MoveOrderer = natural_order, backend: str = NumpyBackend.name, n: int = CONNECT_N,
+                 seed: Optional[int] = None, tablebase: Optional[Tablebase] = None,
+                 exact_depth: Optional[bool] = None):
+        """
+        :param depth: depth at which the search tree is cut and the leaves are evaluated
+        :param deadline: time.perf_counter() value after which the search is aborted with SearchTimeout,
+        None for no time limit
+        :param cache: persistent cache from which results are reused and to which they are stored
+        :param pruning: True for alpha beta pruning, False for plain minimax
+        :param evaluator: utility of the leaves of the tree, calculate_utility for n in a row by default.
+        With a cache, it must have a name attribute identifying it (e.g. ValueNetwork.name), so that
+        the results of different evaluators are stored separately
+        :param orderer: order in which the children of each node are searched
+        :param backend: name of the board backend, one of BACKENDS
+        :param n: number of pieces in a row needed to win
+        :param seed: seed of the default evaluator, None for the global np.random (not reproducible)
+        :param tablebase: agents.tablebase.Tablebase with the exact results of late-game positions
+        :param exact_depth: only reuse cached results of searches of the same depth, so that the result of the
+        search doesn't depend on what deeper searches stored in the cache before, by default for seeded searches
+        """
+        self.depth = depth
+        self.deadline = deadline
+        self.cache = cache
+        self.pruning = pruning
+        if getattr(evaluator, "n", n) != n:
+            raise ValueError(f"the evaluator is for {evaluator.n} in a row, the search for {n}")
+        self.evaluator_name = getattr(evaluator, "name", None)
+        if evaluator is not None and cache is not None and self.evaluator_name is None:
+            raise ValueError("the results of an evaluator without a name attribute can't be cached")
+        self.evaluator = evaluator if evaluator is not None else partial(calculate_utility, n=n, seed=seed)
+        self.evaluate_batch = getattr(evaluator, "evaluate_batch", None)
+        self.orderer = orderer
+        self.backend = BACKENDS[backend]
+        self.n = n
+        self.seed = seed
+        self.tablebase = tablebase
+        self.exact_depth = seed is not None if exact_depth is None else exact_depth
+        self.scope = self.cache_scope()
+        self.nodes = 0
+
+    def cache_scope(self) -> str:
+        """
+        :return: the settings that change the results stored in the cache, so that searches with different
+        settings sharing a cache don't mix their results, "" for the default ones
+        """
+        parts = []
+        if self.n != CONNECT_N:
+            parts.append(f"n={self.n}")
+        if self.seed is not None:
+            parts.append(f"seed={self.seed}")
+        if self.evaluator_name is not None:
+            parts.append(f"evaluator={self.evaluator_name}")
+        if self.tablebase is not None:
+            # tablebases of the same k can cover different positions (built from different games)
+            parts.append(f"tablebase={self.tablebase.digest}")
+        return ",".join(parts)
+
+    def visit(self):
+        """
+        Count one more node and abort the search if we ran out of time
+        """
+        self.nodes += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+
+    def leaf_utilities(self, children: np.ndarray, agent: BoardPiece, opponent: BoardPiece,
+                       current_depth: BoardPiece, maximizing: bool) -> Optional[np.ndarray]:
+        """
+        :param children: children of a node at current_depth
+        :param maximizing: True if the node is a maximizing one (the agent moved to reach the children)
+        :return: utilities of all the children in one batch, if they are leaves and the evaluator
+        supports batches, otherwise None and the children are searched one by one
+        """
+        if self.evaluate_batch is None or current_depth + 1 != self.depth:
+            return None
+        for _ in range(len(children)):
+            self.visit()
+        utilities = self.evaluate_batch(children, agent, opponent)
+        if self.tablebase is not None:
+            for i, child in enumerate(children):
+                if np.isfinite(utilities[i]):
+                    known = self.known_utility(child, agent, opponent, not maximizing)
+                    if known is not None:
+                        utilities[i] = known
+        return utilities
+
+    def known_utility(self, board: np.ndarray, agent: BoardPiece, opponent: BoardPiece,
+                      maximizing: bool) -> Optional[float]:
+        """
+        :param maximizing: True if the agent is to move, False if the opponent is
+        :return: exact utility of the board from the tablebase, inf if the agent wins, -inf if
+        it loses, 0 for a draw, None if there's no tablebase or the board isn't in it
+        """
+        if self.tablebase is None:
+            return None
+        result = self.tablebase.probe(board, agent if maximizing else opponent, self.n)
+        if result is None:
+            return None
+        if result == DRAW:
+            return 0.0
+        return np.inf if (result == WIN) == maximizing else -np.inf
+
+    def children(self, board: np.ndarray, player: BoardPiece) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :return: moves and children of the board, in the order in which they should be searched
+        """
+        moves, children = self.backend.children(board, player)
+        order = self.orderer(moves, children, player)
+        return moves[order], children[order]
+
+    def probe(self, board: np.ndarray, agent: BoardPiece, maximizing: bool, current_depth: BoardPiece,
+              alpha: float, beta: float) -> Optional[Tuple[Optional[PlayerAction], float]]:
+        """
+        :return: move and utility stored in the cache for this node, if they are deep enough
+        and precise enough for the (alpha, beta) window, otherwise None
+        """
+        if self.cache is None or current_depth >= self.depth:
+            return None
+        entry = self.cache.get(board, agent, maximizing, self.depth - current_depth, self.exact_depth,
+                               self.scope)
+        if entry is None:
+            return None
+        flag, utility, move = entry
+        if flag == EXACT or (flag == LOWER and utility >= beta) or (flag == UPPER and utility <= alpha):
+            return move, utility
+        return None
+
+    def store(self, board: np.ndarray, agent: BoardPiece, maximizing: bool, current_depth: BoardPiece,
+              alpha: float, beta: float, move: PlayerAction, utility: float):
+        """
+        Store the result of the search of this node in the cache, as a bound if it fell outside (alpha, beta)
+        """
+        if self.cache is None:
+            return
+        if utility <= alpha:
+            flag = UPPER
+        elif utility >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.cache.put(board, agent, maximizing, self.depth - current_depth, flag, utility, move, self.exact_depth,
+                       self.scope)
+
+
+def maximize(board: np.ndarray, agent: BoardPiece, opponent: BoardPiece, current_depth: BoardPiece,
+             alpha: float = -np.inf, beta: float = np.inf, context: Optional[SearchContext] = None) \
+        -> Tuple[Optional[PlayerAction], float]:
+    """
+    :param board: gets the board as input
+    :param agent: player that has its next move maximized
+    :param opponent: player that has its next move minimized
+    :param current_depth: how deep we are in the search tree
+    :param alpha: value of alpha for the pruning, changes over calls of maximize,
+    is the value of maximum utility found in the children
+    :param beta: value of beta for the pruning, changes over calls of minimize,
+    is the value of minimum utility found in the children
+    :param context: settings and counters of the search, the default is an alpha beta search to DEPTH
+    :return: the move with maximum utility and the maximum utility,i.e,
+    move that the agent is going to play and the utility associated
+    """
+    if context is None:
+        context = SearchContext()
+    context.visit()
+
+    check_status = context.backend.end_state(board, agent, context.n)
+    if check_status == GameState.STILL_PLAYING and current_depth > 0:
+        known = context.known_utility(board, agent, opponent, True)
+        if known is not None:
+            return None, known
+    if check_status != GameState.STILL_PLAYING or current_depth == context.depth:
+        return None, context.evaluator(board, agent, opponent)
+
+    cached = context.probe(board, agent, True, current_depth, alpha, beta)
+    if cached is not None:
+        return cached
+
+    max_utility = alpha
+    move_max_utility = None
+    move_possibilities, children = context.children(board, agent)
+    leaf_utilities = context.leaf_utilities(children, agent, opponent, current_depth, True)
+    for child, move in enumerate(move_possibilities):
+        if leaf_utilities is not None:
+            utility = leaf_utilities[child]
+        else:
+            _, utility = minimize(children[child], agent, opponent, current_depth + BoardPiece(1),
+                                  max_utility if context.pruning else -np.inf, beta, context)
+
+        if utility > max_utility:
+            move_max_utility = move
+            max_utility = utility
+        if context.pruning and max_utility >= beta:
+            break
+
+    if move_max_utility is None:
+        move_max_utility = np.min(move_possibilities)
+    context.store(board, agent, True, current_depth, alpha, beta, move_max_utility, max_utility)
+    return move_max_utility, max_utility
+
+
+def minimize(board: np.ndarray, agent: BoardPiece, opponent: BoardPiece, current_depth: BoardPiece,
+             alpha: float = -np.inf, beta: float = np.inf, context: Optional[SearchContext] = None) \
+        -> Tuple[Optional[PlayerAction], float]:
+    """
+    :param opponent: player that has its next move minimized
+    :param agent: player that has its next move maximized
+    :param board: gets the board as input
+    :param current_depth: how deep we are in the search tree
+    :param alpha: value of alpha for the pruning, changes over calls of maximize,
+    is the value of maximum utility found in the children
+    :param beta: value of beta for the pruning, changes over calls of minimize,
+    is the value of minimum utility found in the children
+    :param context: settings and counters of the search, the default is an alpha beta search to DEPTH
+    :return: the move with minimum utility and the minimum utility, i.e,
+    move that the opponent is going to play and the utility associated with it
+    """
+    if context is None:
+        context = SearchContext()
+    context.visit()
+
+    check_status = context.backend.end_state(board, opponent, context.n)
+    if check_status == GameState.STILL_PLAYING and current_depth > 0:
+        known = context.known_utility(board, agent, opponent, False)
+        if known is not None:
+            return None, known
+    if check_status != GameState.STILL_PLAYING or current_depth == context.depth:
+        return None, context.evaluator(board, agent, opponent)
+
+    cached = context.probe(board, agent, False, current_depth, alpha, beta)
+    if cached is not None:
+        return cached
+
+    min_utility = beta
+    move_min_utility = None
+
+    move_possibilities, children = context.children(board, opponent)
+    leaf_utilities = context.leaf_utilities(children, agent, opponent, current_depth, False)
+    for child, move in enumerate(move_possibilities):
+        if leaf_utilities is not None:
+            utility = leaf_utilities[child]
+        else:
+            _, utility = maximize(children[child], agent, opponent, current_depth + BoardPiece(1),
+                                  alpha, min_utility if context.pruning else np.inf, context)
+
+        if utility <= min_utility:
+            move_min_utility = move
+            min_utility = utility
+
+        if context.pruning and min_utility <= alpha:
+            break
+
+    if move_min_utility is None:
+        move_min_utility = np.min(move_possibilities)
+    context.store(board, agent, False, current_depth, alpha, beta, move_min_utility, min_utility)
+
+    return move_min_utility, min_utility
+
+
+class SearchResult(NamedTuple):
+    move: Optional[PlayerAction]  # best move, None if the game is already over
+    utility: Optional[float]  # utility of the best move for the player to move
+    depth: int  # depth of the deepest search that finished
+    nodes: int  # nodes visited by all the searches
+
+
+def search(board: np.ndarray, player: BoardPiece, depth: Optional[int] = DEPTH, time_limit: Optional[float] = None,
+           **settings) -> SearchResult:
+    """
+    :param board: position to search
+    :param player: player to move, whose utility is maximized
+    :param depth: maximum depth of the search, None to search until the time limit (or the end of the game)
+    :param time_limit: if given, search with iterative deepening and return the result
+    of the deepest search that finished within time_limit seconds. The first iteration
+    always runs to the end, so that there's always a move to play.
+    :param settings: other SearchContext settings (cache, pruning, evaluator, orderer, backend, n, seed,
+    tablebase, exact_depth)
+    :return: best move, its utility, depth reached and nodes visited
+    """
+    t0 = time.perf_counter()
+    opponent = change_player(player)
+    max_depth = int(np.count_nonzero(board == NO_PLAYER)) if depth is None else int(depth)
+    depths = range(max_depth, max_depth + 1) if time_limit is None else range(1, max_depth + 1)
+
+    result = SearchResult(None, None, 0, 0)
+    nodes = 0
+    for current in depths:
+        deadline = None if current == depths[0] or time_limit is None else t0 + time_limit
+        context = SearchContext(depth=current, deadline=deadline, **settings)
+        try:
+            move, utility = maximize(board, player, opponent, BoardPiece(0), context=context)
+        except SearchTimeout:
+            nodes += context.nodes
+            break
+        nodes += context.nodes
+        result = SearchResult(move, utility, current, nodes)
+    return result._replace(nodes=nodes)
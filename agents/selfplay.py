@@ -0,0 +1,59 @@
+"""
+Headless games between agents, without printing the boards.
+"""
+from typing import Iterator, Tuple
+
+from agents.Common import BoardPiece, GenMove, GameState, NO_PLAYER, PLAYER1, PLAYER2
+from agents.Common import apply_player_action, check_end_state, moves_to_board, player_to_move
+from agents.registry import load_agent
+
+
+def play_game(generate_move_1: GenMove, generate_move_2: GenMove, opening: str = "",
+              args_1: tuple = (), args_2: tuple = ()) -> Tuple[BoardPiece, str]:
+    """
+    :param generate_move_1: agent playing PLAYER1
+    :param generate_move_2: agent playing PLAYER2
+    :param opening: moves played before the agents take over, e.g. "33"
+    :param args_1: extra arguments of generate_move_1
+    :param args_2: extra arguments of generate_move_2
+    :return: the winner (NO_PLAYER for a draw) and all the moves of the game, opening included
+    """
+    board = moves_to_board(opening)
+    moves = opening
+    player = player_to_move(board)
+    gen_moves = {PLAYER1: (generate_move_1, args_1), PLAYER2: (generate_move_2, args_2)}
+    saved_state = {PLAYER1: None, PLAYER2: None}
+    for previous in (PLAYER1, PLAYER2):
+        end_state = check_end_state(board, previous)
+        if end_state == GameState.IS_WIN:
+            return previous, moves
+    if end_state == GameState.IS_DRAW:
+        return NO_PLAYER, moves
+
+    while True:
+        gen_move, args = gen_moves[player]
+        action, saved_state[player] = gen_move(board.copy(), player, saved_state[player], *args)
+        apply_player_action(board, action, player)
+        moves += str(int(action))
+        end_state = check_end_state(board, player)
+        if end_state == GameState.IS_WIN:
+            return player, moves
+        if end_state == GameState.IS_DRAW:
+            return NO_PLAYER, moves
+        player = PLAYER2 if player == PLAYER1 else PLAYER1
+
+
+def selfplay(agent_1: str, agent_2: str, games: int, opening: str = "") -> Iterator[Tuple[str, str, BoardPiece, str]]:
+    """
+    Play `games` games between two registered agents, alternating who plays first.
+    :param agent_1: name of the first agent
+    :param agent_2: name of the second agent
+    :param games: number of games
+    :param opening: moves played at the start of every game
+    :return: iterator over (agent playing PLAYER1, agent playing PLAYER2, winner, moves) of each game
+    """
+    names = (agent_1, agent_2)
+    for game in range(games):
+        first, second = names if game % 2 == 0 else names[::-1]
+        winner, moves = play_game(load_agent(first), load_agent(second), opening)
+        yield first, second, winner, moves
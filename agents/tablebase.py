@@ -0,0 +1,222 @@
+"""
+Late-game tablebase: the exact result of every position with at most K empty cells reachable
+from a set of root positions (e.g. the positions of self-play games when K cells were left empty,
+or the empty board for small geometries), computed offline by retrograde analysis.
+
+Every move fills one cell, so the positions are enumerated forward, layer by layer (number of empty
+cells), and then solved backwards from the full boards: a position is won if a move connects four
+or leads to a lost position, drawn if a move leads to a drawn one, lost otherwise.
+
+The file holds a header, the canonical keys of the positions (agents.bitboard, the same for a position
+and its mirror image) as sorted 64 bits integers, and their results packed on 2 bits. It is memory
+mapped, so probing is a binary search in pages shared by all the processes using the same file.
+The header has a digest of the keys and results, which tells apart tablebases of the same size.
+The results are for the player to move, the search engine maps them to +-inf (win/loss) or 0 (draw).
+
+usage:
+    python main.py selfplay alphabeta alphabeta -n 100 --output games.jsonl
+    python -m agents.tablebase -k 10 --games games.jsonl -o tablebase.bin
+    python -m agents.tablebase --rows 4 --columns 5 -k 20 -o small.bin     (all positions)
+"""
+import argparse
+import hashlib
+import json
+import struct
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from agents.Common import BoardPiece, NO_PLAYER, ROWS, COLUMNS, CONNECT_N, LOSS, DRAW, WIN
+from agents.bitboard import BitboardGeometry, get_bitboard_geometry
+
+# magic, version, rows, columns, n, k, reserved, number of positions, digest of the keys and results
+HEADER = struct.Struct("<4s6HQ16s")
+MAGIC = b"C4TB"
+VERSION = 2
+
+
+def root_positions(games: Iterable[str], k: int, geometry: BitboardGeometry) -> Iterator[Tuple[int, int]]:
+    """
+    :param games: move strings, e.g. "3342..."
+    :param k: maximum number of empty cells of the positions of the tablebase
+    :param geometry: geometry of the games
+    :return: for every game that gets there, the first position with at most k empty cells,
+    as position and mask of the player to move
+    """
+    cells = geometry.rows * geometry.columns
+    for moves in games:
+        position = mask = 0
+        for played, move in enumerate(moves):
+            if cells - played <= k:
+                yield position, mask
+                break
+            position, mask = geometry.play(position, mask, int(move))
+            if geometry.is_win(mask ^ position):
+                break
+        else:
+            if cells - len(moves) <= k and not geometry.is_win(mask ^ position):
+                yield position, mask
+
+
+def retrograde(roots: Iterable[Tuple[int, int]], k: int, geometry: BitboardGeometry) -> Dict[int, int]:
+    """
+    :param roots: positions (position, mask) from which the tablebase positions are reached, any number
+    of empty cells, but the enumeration only fits in memory if there are not too many above k
+    :param k: maximum number of empty cells of the positions of the tablebase
+    :param geometry: geometry of the positions
+    :return: result (LOSS, DRAW or WIN for the player to move) of every position reachable from the roots
+    with at most k empty cells, by canonical key. Positions where a player already won are not included.
+    """
+    cells = geometry.rows * geometry.columns
+    # layers[e]: positions with e empty cells, by canonical key
+    layers: Dict[int, Dict[int, Tuple[int, int]]] = {}
+    for position, mask in roots:
+        empty = cells - bin(mask).count("1")
+        layers.setdefault(empty, {})[geometry.key(position, mask)] = (position, mask)
+
+    # forward, from the emptiest layer: every move goes one layer down
+    results: Dict[int, int] = {}
+    for empty in range(max(layers, default=0), 0, -1):
+        below = layers.setdefault(empty - 1, {})
+        for key, (position, mask) in layers[empty].items():
+            for column in geometry.legal_columns(mask):
+                child = geometry.play(position, mask, column)
+                if geometry.is_win(child[1] ^ child[0]):
+                    if empty <= k:
+                        results[key] = WIN
+                else:
+                    below.setdefault(geometry.key(*child), child)
+        if empty > k:
+            del layers[empty]
+
+    # backward, from the full boards: the results of the layer below are all known
+    for empty in range(0, k + 1):
+        for key, (position, mask) in layers.get(empty, {}).items():
+            if key in results:
+                continue
+            result = LOSS if empty else DRAW
+            for column in geometry.legal_columns(mask):
+                child_result = results[geometry.key(*geometry.play(position, mask, column))]
+                if child_result == LOSS:
+                    result = WIN
+                    break
+                if child_result == DRAW:
+                    result = DRAW
+            results[key] = result
+    return results
+
+
+def write_tablebase(path: str, results: Dict[int, int], k: int, geometry: BitboardGeometry):
+    """
+    :param path: file to write
+    :param results: output of retrograde
+    :param k: maximum number of empty cells of the positions
+    :param geometry: geometry of the positions, its keys must fit in 64 bits
+    """
+    if geometry.height * geometry.columns > 64:
+        raise ValueError(f"the keys of a {geometry.rows}x{geometry.columns} board don't fit in 64 bits")
+    keys = np.array(sorted(results), dtype=np.uint64)
+    values = np.array([results[int(key)] for key in keys], dtype=np.uint8)
+    packed = np.zeros((len(values) + 3) // 4, dtype=np.uint8)
+    for i in range(4):
+        packed[:len(values[i::4])] |= values[i::4] << (2 * i)
+    data = keys.astype("<u8").tobytes() + packed.tobytes()
+    digest = hashlib.sha1(data).digest()[:16]
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, geometry.rows, geometry.columns, geometry.n, k, 0, len(keys), digest))
+        file.write(data)
+
+
+class Tablebase:
+    """
+    Memory mapped tablebase file, written by write_tablebase
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: tablebase file
+        """
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            raise ValueError(f"{path} is not a tablebase file")
+        _, version, rows, columns, n, k, _, count, digest = HEADER.unpack(header)
+        if version != VERSION:
+            raise ValueError(f"{path} is a tablebase file of version {version}, rebuild it for version {VERSION}")
+        self.path = path
+        self.k = k
+        self.digest = digest.hex()  # identifies the content of the tablebase
+        self.geometry = get_bitboard_geometry(rows, columns, n)
+        self.keys = np.memmap(path, dtype="<u8", mode="r", offset=HEADER.size, shape=(count,)) \
+            if count else np.zeros(0, dtype=np.uint64)
+        self.results = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER.size + 8 * count,
+                                 shape=((count + 3) // 4,)) if count else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def probe(self, board: np.ndarray, player: BoardPiece, n: int = CONNECT_N) -> Optional[int]:
+        """
+        :param board: board to look up
+        :param player: player to move
+        :param n: number of pieces in a row needed to win in the search
+        :return: LOSS, DRAW or WIN for the player to move, None if the position is not in the tablebase
+        """
+        geometry = self.geometry
+        if board.shape != (geometry.rows, geometry.columns) or n != geometry.n \
+                or np.count_nonzero(board == NO_PLAYER) > self.k:
+            return None
+        key = np.uint64(geometry.key(*geometry.from_board(board, player)))
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or self.keys[i] != key:
+            return None
+        return int(self.results[i // 4] >> (2 * (i % 4))) & 3
+
+
+def build(path: str, k: int, games: Iterable[str] = (), rows: int = ROWS, columns: int = COLUMNS,
+          n: int = CONNECT_N) -> int:
+    """
+    :param path: tablebase file to write
+    :param k: maximum number of empty cells of the positions
+    :param games: move strings whose first positions with at most k empty cells are the roots,
+    without games the root is the empty board (only feasible for small boards)
+    :param rows: rows of the board
+    :param columns: columns of the board
+    :param n: number of pieces in a row needed to win
+    :return: number of positions written
+    """
+    geometry = get_bitboard_geometry(rows, columns, n)
+    games = list(games)
+    roots = list(root_positions(games, k, geometry)) if games else [(0, 0)]
+    results = retrograde(roots, k, geometry)
+    write_tablebase(path, results, k, geometry)
+    return len(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m agents.tablebase",
+                                     description="build a late-game tablebase by retrograde analysis")
+    parser.add_argument("-o", "--output", default="tablebase.bin", help="tablebase file")
+    parser.add_argument("-k", "--empty", type=int, required=True, help="maximum number of empty cells")
+    parser.add_argument("-g", "--games", help="JSON lines games, from main.py selfplay --output, "
+                                              "or one move string per line (default: from the empty board)")
+    parser.add_argument("--rows", type=int, default=ROWS, help="rows of the board")
+    parser.add_argument("--columns", type=int, default=COLUMNS, help="columns of the board")
+    parser.add_argument("-n", "--connect", type=int, default=CONNECT_N, help="pieces in a row needed to win")
+    args = parser.parse_args(argv)
+
+    games: List[str] = []
+    if args.games is not None:
+        with open(args.games) as file:
+            for line in file:
+                line = line.strip()
+                if line:
+                    games.append(json.loads(line)["moves"] if line.startswith("{") else line)
+    t0 = time.perf_counter()
+    count = build(args.output, args.empty, games, args.rows, args.columns, args.connect)
+    print(f"{count} positions with at most {args.empty} empty cells written to {args.output} "
+          f"in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
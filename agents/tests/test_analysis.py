@@ -0,0 +1,80 @@
+import numpy as np
+from agents.Common import PLAYER1, PLAYER2
+from agents.tests.test_helpers import *
+
+
+def test_packed_board():
+    from agents.Common import board_to_packed, packed_to_board
+
+    test_board = initialize_test_board()
+    packed = board_to_packed(test_board)
+    assert len(packed) == 42
+    assert np.all(packed_to_board(packed) == test_board)
+
+
+def test_moves_to_board():
+    from agents.Common import moves_to_board, player_to_move
+
+    board = moves_to_board("3342")
+    assert board[0, 3] == PLAYER1
+    assert board[1, 3] == PLAYER2
+    assert board[0, 4] == PLAYER1
+    assert board[0, 2] == PLAYER2
+    assert player_to_move(board) == PLAYER1
+    assert player_to_move(moves_to_board("334")) == PLAYER2
+
+
+def test_iter_records():
+    from agents.analysis import iter_records, record_to_board
+
+    lines = ["# comment\n", "3342\n", "\n"] + [line + "\n" for line in pretty_print_test_board().splitlines()]
+    lines += ["0" * 42 + "\n"]
+    records = list(iter_records(lines))
+    assert len(records) == 3
+    assert records[0] == "3342"
+    assert np.all(record_to_board(records[1]) == initialize_test_board())
+    assert np.all(record_to_board(records[2]) == 0)
+
+
+def test_analyze_position():
+    from agents.analysis import analyze_position
+    from agents.Common import moves_to_board
+
+    # PLAYER1 has three in a row on the bottom row and wins by playing column 0 or 4
+    ret = analyze_position(moves_to_board("162535"), depth=2)
+    assert ret["move"] in (0, 4)
+    assert ret["score"] == "inf"
+    assert ret["depth"] == 2
+    assert ret["nodes"] > 0
+
+    ret = analyze_position(moves_to_board("162535"), depth=None, time_limit=0.01)
+    assert ret["move"] in (0, 4)
+    assert ret["depth"] >= 1
+
+
+def test_analyze_stream_keeps_order():
+    from agents.analysis import analyze_stream
+
+    records = ["3", "99", "33", "0" * 42, "162535"]
+    ret = list(analyze_stream(records, depth=1, workers=2))
+    assert [r["position"] for r in ret] == records
+    assert "error" in ret[1]
+    assert ret[2]["player"] == PLAYER1
+    assert ret[0]["player"] == PLAYER2
+
+
+def test_invalid_records():
+    import pytest
+    from agents.analysis import record_to_board, analyze_stream, iter_records
+
+    pretty = pretty_print_test_board().splitlines()
+    truncated = "\n".join(pretty[:3] + pretty[-2:])
+    # truncated boards, wrong number of pieces and floating pieces
+    for record in (truncated, "|", "\n".join(pretty[:-1]), "1" * 42, "22" + "0" * 40, "0" * 7 + "1" + "0" * 34):
+        with pytest.raises(ValueError):
+            record_to_board(record)
+
+    lines = [line + "\n" for line in ["3342", "|"] + pretty + pretty[:4] + ["33"]]
+    ret = list(analyze_stream(iter_records(lines), depth=1, workers=2))
+    assert [r["position"] for r in ret] == ["3342", "|", "\n".join(pretty), "\n".join(pretty[:4]), "33"]
+    assert ["error" in r for r in ret] == [False, True, False, True, False]
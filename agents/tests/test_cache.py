@@ -0,0 +1,149 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from agents.Common import BoardPiece, PlayerAction, PLAYER1, PLAYER2, player_to_move
+from agents.tests.test_helpers import *
+
+
+def test_put_get(tmp_path):
+    from agents.cache import SearchCache, EXACT, LOWER
+
+    test_board = initialize_test_board()
+    with SearchCache(str(tmp_path / "cache.db")) as cache:
+        assert cache.get(test_board, PLAYER1, True, 1) is None
+        cache.put(test_board, PLAYER1, True, 3, EXACT, 4.0, PlayerAction(2))
+        cache.put(test_board, PLAYER1, False, 2, LOWER, np.inf, PlayerAction(5))
+        assert cache.get(test_board, PLAYER1, True, 3) == (EXACT, 4.0, 2)
+        assert cache.get(test_board, PLAYER1, False, 2) == (LOWER, np.inf, 5)
+        # results are only valid for searches of the same or a smaller depth
+        assert cache.get(test_board, PLAYER1, True, 4) is None
+        assert cache.get(test_board, PLAYER2, True, 1) is None
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 3
+
+    # the results are still there in a new run, and a shallower result doesn't overwrite a deeper one
+    with SearchCache(str(tmp_path / "cache.db")) as cache:
+        assert cache.get(test_board, PLAYER1, True, 3) == (EXACT, 4.0, 2)
+        cache.put(test_board, PLAYER1, True, 1, EXACT, -18.0, PlayerAction(0))
+        # the buffered result updates a stored position, it isn't a new one, and it isn't deeper
+        assert len(cache) == 2
+        assert cache.stats()["writes"] == 0
+        assert cache.get(test_board, PLAYER1, True, 3) == (EXACT, 4.0, 2)
+        cache.put(test_board, PLAYER1, True, 4, EXACT, 5.0, PlayerAction(3))
+        assert len(cache) == 2
+        assert cache.stats()["writes"] == 1
+
+
+def test_exact_depth(tmp_path):
+    from agents.cache import SearchCache, EXACT
+
+    test_board = initialize_test_board()
+    with SearchCache(str(tmp_path / "cache.db")) as cache:
+        cache.put(test_board, PLAYER1, True, 3, EXACT, 4.0, PlayerAction(2), exact_depth=True)
+        cache.put(test_board, PLAYER1, True, 1, EXACT, -18.0, PlayerAction(0), exact_depth=True)
+        assert cache.get(test_board, PLAYER1, True, 2, exact_depth=True) is None
+        assert cache.get(test_board, PLAYER1, True, 1, exact_depth=True) == (EXACT, -18.0, 0)
+        assert cache.get(test_board, PLAYER1, True, 3, exact_depth=True) == (EXACT, 4.0, 2)
+        assert cache.get(test_board, PLAYER1, True, 1) is None
+
+
+def test_analysis_ignores_deeper_results(tmp_path):
+    from agents.analysis import analyze_stream
+
+    path = str(tmp_path / "cache.db")
+    fresh = list(analyze_stream(["3342", "33"], depth=2))
+    list(analyze_stream(["3342", "33"], depth=4, cache_path=path))
+    cached = list(analyze_stream(["3342", "33"], depth=2, cache_path=path))
+    for before, after in zip(fresh, cached):
+        assert (before["move"], before["score"], before["depth"]) == (after["move"], after["score"], after["depth"])
+        # the search of "33" to depth 4 stored "3342" searched to depth 2, which is reused
+        assert after["nodes"] <= before["nodes"]
+
+
+def test_seeded_search_with_cache(tmp_path):
+    from agents.cache import SearchCache
+    from agents.search import search
+    from agents.Common import moves_to_board
+    from agents.agent_minimax_prunning.minimax_with_prunning import generate_move_minimax_pruning
+
+    boards = [moves_to_board(moves) for moves in ("", "3342", "162535", "0011223")]
+    with SearchCache(str(tmp_path / "cache.db")) as cache:
+        for depth in (4, 2, 3, 1, 4):
+            for board in boards:
+                player = player_to_move(board)
+                fresh = search(board, player, depth=depth, seed=1)
+                cached = search(board, player, depth=depth, seed=1, cache=cache)
+                assert (cached.move, cached.utility) == (fresh.move, fresh.utility)
+                assert cached.nodes <= fresh.nodes
+        # the results of other seeds and of other n are stored separately
+        cache.flush()
+        written = len(cache)
+        search(boards[1], PLAYER1, depth=2, seed=2, cache=cache)
+        search(boards[1], PLAYER1, depth=2, seed=1, cache=cache, n=5)
+        assert cache.get(boards[1], PLAYER1, True, 2, True, "seed=2") is not None
+        assert cache.get(boards[1], PLAYER1, True, 2, True, "n=5,seed=1") is not None
+        cache.flush()
+        assert len(cache) > written
+        for seed in (1, 2):
+            move, _ = generate_move_minimax_pruning(boards[2], PLAYER1, cache=cache, seed=seed)
+            assert move == search(boards[2], PLAYER1, seed=seed).move
+
+
+def test_eviction(tmp_path):
+    from agents.cache import SearchCache, EXACT
+    from agents.Common import apply_player_action
+
+    with SearchCache(str(tmp_path / "cache.db"), max_entries=10, flush_every=5) as cache:
+        board = initialize_game_state()
+        cache.put(board, PLAYER1, True, 1, EXACT, 0.0, PlayerAction(0))
+        for action in range(7):
+            for player in (PLAYER1, PLAYER2):
+                child = apply_player_action(board, PlayerAction(action), player, copy=True)
+                cache.put(child, PLAYER1, True, 1, EXACT, 0.0, PlayerAction(0))
+            # keep the empty board in use
+            cache.get(board, PLAYER1, True, 1)
+        # a buffered deeper result of a stored position doesn't count as one more position
+        cache.put(board, PLAYER1, True, 2, EXACT, 0.0, PlayerAction(0))
+        assert len(cache) <= 10
+        assert cache.stats()["evictions"] == 1 + 14 - len(cache)
+        assert cache.get(board, PLAYER1, True, 1) is not None
+
+
+def _write_entries(path: str, player: BoardPiece) -> int:
+    from agents.cache import SearchCache, EXACT
+    from agents.Common import apply_player_action
+
+    with SearchCache(path, flush_every=3) as cache:
+        for action in range(7):
+            board = apply_player_action(initialize_game_state(), PlayerAction(action), player)
+            cache.put(board, player, True, 2, EXACT, float(action), PlayerAction(action))
+        # deeper results of the same positions, some of them already in the file
+        for action in range(7):
+            board = apply_player_action(initialize_game_state(), PlayerAction(action), player)
+            cache.put(board, player, True, 3, EXACT, float(action), PlayerAction(action))
+        assert cache.stats()["writes"] == 14
+    return 7
+
+
+def test_concurrent_writers(tmp_path):
+    from agents.cache import SearchCache
+
+    path = str(tmp_path / "cache.db")
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        written = sum(executor.map(_write_entries, [path, path], [PLAYER1, PLAYER2]))
+    with SearchCache(path) as cache:
+        assert len(cache) == written
+
+
+def test_search_warm_start(tmp_path):
+    from agents.cache import SearchCache
+    from agents.agent_minimax_prunning.minimax_with_prunning import maximize, SearchContext
+
+    test_board = initialize_test_board()
+    with SearchCache(str(tmp_path / "cache.db")) as cache:
+        cold = SearchContext(depth=2, cache=cache)
+        move, utility = maximize(test_board, PLAYER2, PLAYER1, BoardPiece(0), context=cold)
+    with SearchCache(str(tmp_path / "cache.db")) as cache:
+        warm = SearchContext(depth=2, cache=cache)
+        assert maximize(test_board, PLAYER2, PLAYER1, BoardPiece(0), context=warm) == (move, utility)
+        assert cache.hits == 1
+    assert warm.nodes < cold.nodes
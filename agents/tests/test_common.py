@@ -80,3 +80,40 @@ def test_check_end_state():
     assert ret_playing == GameState.STILL_PLAYING
     assert isinstance(ret_win, GameState)
     assert ret_win == GameState.IS_WIN
+
+
+def test_geometry():
+    from agents.Common import get_geometry
+
+    geometry = get_geometry(6, 7, 4)
+    assert geometry.windows.shape == (69, 4)
+    assert get_geometry(6, 7, 4) is geometry
+    assert np.all(np.any(geometry.cell_windows[0] == 0, axis=1))
+    assert [len(windows) for windows in geometry.cell_windows][:4] == [3, 4, 5, 7]
+    assert get_geometry(9, 10, 5).windows.shape == (9 * 6 + 10 * 5 + 2 * 5 * 6, 5)
+
+
+def test_connect_n():
+    from agents.Common import connected_four, check_end_state, GameState, moves_to_board
+
+    board = moves_to_board("12233434445", rows=9, columns=10)
+    board[4, 5] = PLAYER1
+    assert not connected_four(board, PLAYER1)
+    assert connected_four(board, PLAYER1, n=3)
+    assert not connected_four(board, PLAYER1, n=5)
+    board[[0, 1, 2, 3, 4], [4, 5, 6, 7, 8]] = PLAYER2
+    assert connected_four(board, PLAYER2, n=5)
+    assert connected_four(board, PLAYER2, last_action=PlayerAction(8), n=5)
+    assert not connected_four(board, PLAYER2, last_action=PlayerAction(1), n=5)
+    assert check_end_state(board, PLAYER2, n=5) == GameState.IS_WIN
+    assert check_end_state(board, PLAYER1, n=5) == GameState.STILL_PLAYING
+
+
+def test_pretty_print_any_shape():
+    from agents.Common import pretty_print_board, string_to_board, moves_to_board
+
+    board = moves_to_board("0123456789999", rows=9, columns=10)
+    printed = pretty_print_board(board)
+    assert printed.splitlines()[-1] == "|0 1 2 3 4 5 6 7 8 9|"
+    assert len(printed.splitlines()) == 9 + 3
+    assert np.all(string_to_board(printed) == board)
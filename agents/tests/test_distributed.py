@@ -0,0 +1,128 @@
+import json
+import socket
+import time
+from multiprocessing import Process
+from agents.Common import NO_PLAYER, PLAYER1, PLAYER2
+
+
+def _take_job(address) -> socket.socket:
+    """
+    act as a worker that asks for a job and never sends its result
+    """
+    connection = socket.create_connection(address)
+    connection.sendall(b'{"type": "job"}\n')
+    reply = json.loads(connection.makefile().readline())
+    assert reply["type"] == "job"
+    return connection
+
+
+def test_local_workers():
+    from agents.distributed import Coordinator, selfplay_jobs, run_worker
+    from agents.Common import moves_to_board, check_end_state, GameState
+
+    with Coordinator(selfplay_jobs("random", "random", 8, opening="3")) as coordinator:
+        workers = [Process(target=run_worker, args=coordinator.address) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        results = list(coordinator.results())
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+
+    assert sorted(result["id"] for result in results) == list(range(8))
+    for result in results:
+        assert result["moves"].startswith("3")
+        assert result["winner"] in (NO_PLAYER, PLAYER1, PLAYER2)
+        if result["winner"] != NO_PLAYER:
+            assert check_end_state(moves_to_board(result["moves"]), result["winner"]) == GameState.IS_WIN
+
+
+def test_retry_after_disconnect():
+    from agents.distributed import Coordinator, selfplay_jobs, run_worker
+
+    with Coordinator(selfplay_jobs("random", "random", 3)) as coordinator:
+        # this worker dies while playing its game
+        _take_job(coordinator.address).close()
+        assert run_worker(*coordinator.address) == 3
+        results = list(coordinator.results())
+    assert sorted(result["id"] for result in results) == [0, 1, 2]
+    assert not any("error" in result for result in results)
+
+
+def test_lease_timeout_and_failure():
+    from agents.distributed import Coordinator, selfplay_jobs, run_worker
+
+    with Coordinator(selfplay_jobs("random", "random", 2), lease_timeout=0.2, max_attempts=2) as coordinator:
+        # the first job is leased twice by a worker that hangs, and then reported as failed
+        hanging = [_take_job(coordinator.address)]
+        assert run_worker(*coordinator.address, wait=0.1, max_jobs=1) == 1
+        time.sleep(0.3)
+        hanging.append(_take_job(coordinator.address))
+        time.sleep(0.3)
+        assert run_worker(*coordinator.address, wait=0.1) == 0
+        results = sorted(coordinator.results(), key=lambda result: result["id"])
+        for connection in hanging:
+            connection.close()
+    assert "error" in results[0]
+    assert "moves" in results[1]
+
+
+def test_concurrent_completions():
+    import queue
+    import threading
+    from agents.distributed import Coordinator, selfplay_jobs
+
+    class SlowQueue(queue.Queue):
+        """
+        queue where the result of job 1 is only queued once job 0 was completed
+        """
+
+        def put(self, item, *args, **kwargs):
+            if isinstance(item, dict) and item["id"] == 1:
+                completed.wait(5)
+            super().put(item, *args, **kwargs)
+
+    completed = threading.Event()
+    with Coordinator(selfplay_jobs("random", "random", 2)) as coordinator:
+        coordinator._results = SlowQueue()
+        first, second = coordinator._lease(), coordinator._lease()
+        # the last job is completed first, but its result is queued after the result of the other one
+        late = threading.Thread(target=coordinator._complete, args=({"id": second["id"], "winner": 0, "moves": ""},))
+        late.start()
+        coordinator._complete({"id": first["id"], "winner": 0, "moves": ""})
+        completed.set()
+        late.join()
+        assert sorted(result["id"] for result in coordinator.results()) == [0, 1]
+        # the end of the results is only marked once
+        assert coordinator._results.empty()
+
+    with Coordinator(selfplay_jobs("random", "random", 400), max_pending_results=2) as coordinator:
+        jobs = [coordinator._lease() for _ in range(400)]
+        barrier = threading.Barrier(8)
+
+        def complete(worker: int):
+            barrier.wait()
+            for job in jobs[worker::8]:
+                coordinator._complete({"id": job["id"], "winner": 0, "moves": ""})
+
+        threads = [threading.Thread(target=complete, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        results = list(coordinator.results())
+        for thread in threads:
+            thread.join()
+        assert sorted(result["id"] for result in results) == list(range(400))
+        assert coordinator._results.empty()
+
+def test_unknown_job_id():
+    from agents.distributed import Coordinator, selfplay_jobs
+
+    with Coordinator(selfplay_jobs("random", "random", 1)) as coordinator:
+        with socket.create_connection(coordinator.address) as connection, connection.makefile("rw") as stream:
+            stream.write(json.dumps({"type": "result", "id": 7, "winner": 0, "moves": ""}) + "\n")
+            stream.flush()
+            assert json.loads(stream.readline())["type"] == "error"
+            # the connection is still served
+            stream.write('{"type": "job"}\n')
+            stream.flush()
+            assert json.loads(stream.readline())["id"] == 0
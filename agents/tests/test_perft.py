@@ -0,0 +1,49 @@
+import numpy as np
+from agents.Common import PLAYER1, PLAYER2
+from agents.tests.test_helpers import *
+
+
+def test_bitboard():
+    from agents.bitboard import get_bitboard_geometry
+    from agents.Common import moves_to_board, connected_four
+
+    geometry = get_bitboard_geometry(6, 7, 4)
+    board = moves_to_board("3342256")
+    position, mask = geometry.from_board(board, PLAYER2)
+    assert np.all(geometry.to_board(position, mask, PLAYER2, PLAYER1) == board)
+    assert geometry.legal_columns(mask) == list(range(7))
+
+    position, mask = geometry.play(position, mask, 4)
+    assert np.all(geometry.to_board(position, mask, PLAYER1, PLAYER2) == moves_to_board("33422564"))
+    assert geometry.mirror(mask) == geometry.from_board(np.fliplr(moves_to_board("33422564")), PLAYER1)[1]
+
+    test_board = initialize_test_board()
+    for player in (PLAYER1, PLAYER2):
+        assert geometry.is_win(geometry.from_board(test_board, player)[0]) == connected_four(test_board, player)
+    test_board[0, 5] = PLAYER1
+    test_board[0, 6] = PLAYER1
+    assert geometry.is_win(geometry.from_board(test_board, PLAYER1)[0])
+
+
+def test_perft_reference():
+    from agents.perft import perft, perft_backends, REFERENCE_COUNTS
+
+    for backend in perft_backends():
+        for depth in range(5):
+            assert perft(initialize_game_state(), PLAYER1, depth, backend) == REFERENCE_COUNTS[depth]
+
+
+def test_perft_divide():
+    from agents.perft import perft, divide, run
+    from agents.Common import moves_to_board
+
+    # PLAYER1 wins by playing column 0 or 4, and these games are not expanded
+    board = moves_to_board("162535")
+    counts = divide(board, PLAYER1, 3)
+    assert counts[0] == counts[4] == 0
+    assert sum(counts.values()) == perft(board, PLAYER1, 3) == perft(board, PLAYER1, 3, "bitboard")
+    assert divide(board, PLAYER1, 3, "bitboard", workers=2) == counts
+
+    rows = run("", range(1, 4), workers=1, rows=5, columns=5, n=3)
+    assert all(row["ok"] for row in rows)
+    assert rows[0]["nodes"] == 5
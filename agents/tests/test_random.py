@@ -13,3 +13,11 @@ def test_generate_move_random():
     for i in range(50):
         ret, _ = random.generate_move_random(test_board)
         assert 2 != ret  # second column is full in this example board
+
+
+def test_generate_move_random_rng():
+    from agents.agent_random import generate_move
+
+    board = initialize_game_state()
+    moves = [generate_move(board, PLAYER1, None, np.random.default_rng(3))[0] for _ in range(3)]
+    assert len(set(moves)) == 1
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+from agents.Common import NO_PLAYER, PLAYER1, PLAYER2
+
+
+def test_registry_is_lazy():
+    from agents.benchmark import ROOT
+
+    code = "import sys, main, agents.registry; assert 'numpy' not in sys.modules, 'numpy was imported'"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+    # the search agents don't load the cache and the tablebase unless they are given one
+    code = ("import sys; from agents.registry import load_agent; load_agent('minimax'); load_agent('alphabeta'); "
+            "loaded = {'sqlite3', 'agents.cache', 'agents.tablebase', 'agents.bitboard'} & set(sys.modules); "
+            "assert not loaded, loaded")
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+
+
+def test_load_agent():
+    import pytest
+    from agents.registry import load_agent, register_agent, available_agents
+    from agents.agent_random import generate_move
+
+    assert load_agent("random") is generate_move
+    assert {"random", "minimax", "alphabeta", "human"} <= set(available_agents())
+    with pytest.raises(KeyError):
+        load_agent("unknown")
+    with pytest.raises(ValueError):
+        register_agent("random_again", "agents.agent_random.generate_move")
+
+
+def test_play_game():
+    from agents.selfplay import play_game, selfplay
+    from agents.Common import moves_to_board, check_end_state, GameState
+    from agents.registry import load_agent, register_agent
+
+    winner, moves = play_game(load_agent("random"), load_agent("random"), opening="33")
+    assert moves.startswith("33")
+    board = moves_to_board(moves)
+    if winner == NO_PLAYER:
+        assert check_end_state(board, PLAYER1) == GameState.IS_DRAW
+    else:
+        assert check_end_state(board, winner) == GameState.IS_WIN
+
+    register_agent("random_2", "agents.agent_random:generate_move")
+    games = list(selfplay("random", "random_2", 2, opening="3333"))
+    assert [(first, second) for first, second, _, _ in games] == [("random", "random_2"), ("random_2", "random")]
+
+
+def test_human_agent_and_selfplay_score(capsys):
+    from agents.registry import load_agent
+    from agents.human import user_move
+    from main import main
+
+    assert load_agent("human") is user_move
+    main(["selfplay", "random", "random", "-n", "4"])
+    summary = capsys.readouterr().out.splitlines()[-1]
+    counts = dict(part.rsplit(" ", 1) for part in summary.split(", "))
+    assert set(counts) == {"player 1", "player 2", "draw"}
+    assert sum(int(count) for count in counts.values()) == 4
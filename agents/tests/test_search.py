@@ -0,0 +1,64 @@
+import numpy as np
+from agents.Common import BoardPiece, PLAYER1, PLAYER2, connected_four
+from agents.tests.test_helpers import *
+
+
+def center_evaluator(board: np.ndarray, agent: BoardPiece, opponent: BoardPiece) -> float:
+    """
+    deterministic evaluator, so that searches with different settings can be compared
+    """
+    if connected_four(board, opponent):
+        return -np.inf
+    if connected_four(board, agent):
+        return np.inf
+    weights = np.array([0, 1, 2, 3, 2, 1, 0])
+    return float(np.sum(weights * (board == agent)) - np.sum(weights * (board == opponent)))
+
+
+def test_pruning_keeps_utility():
+    from agents.search import search, center_first
+
+    test_board = initialize_test_board()
+    plain = search(test_board, PLAYER2, depth=3, pruning=False, evaluator=center_evaluator)
+    pruned = search(test_board, PLAYER2, depth=3, pruning=True, evaluator=center_evaluator)
+    ordered = search(test_board, PLAYER2, depth=3, pruning=True, evaluator=center_evaluator, orderer=center_first)
+
+    assert plain.utility == pruned.utility == ordered.utility
+    assert plain.move == pruned.move
+    assert pruned.nodes < plain.nodes
+    assert ordered.nodes <= pruned.nodes
+
+
+def test_search_time_limit():
+    from agents.search import search
+
+    ret = search(initialize_game_state(), PLAYER1, depth=None, time_limit=0.05, evaluator=center_evaluator)
+    assert 0 <= ret.move < 7
+    assert ret.depth >= 1
+    assert ret.nodes > 0
+
+
+def test_wrappers():
+    from agents.agent_minimax import generate_move_minimax
+    from agents.agent_minimax_prunning import generate_move_minimax_pruning
+    from agents.Common import moves_to_board
+
+    # PLAYER1 wins by playing column 0 or 4
+    board = moves_to_board("162535")
+    assert generate_move_minimax(board, PLAYER1)[0] in (0, 4)
+    assert generate_move_minimax_pruning(board, PLAYER1)[0] in (0, 4)
+
+
+def test_seeded_search():
+    from agents.search import search, board_noise
+    from agents.agent_minimax_prunning import generate_move_minimax_pruning
+    from agents.Common import moves_to_board
+
+    board = moves_to_board("3342")
+    first = search(board, PLAYER1, depth=4, seed=0)
+    assert search(board, PLAYER1, depth=4, seed=0) == first
+    # the noise depends on the board only, so pruning doesn't change the utility
+    assert search(board, PLAYER1, depth=4, seed=0, pruning=False).utility == first.utility
+    assert len({board_noise(board, seed) for seed in range(20)}) > 1
+    assert all(0 <= board_noise(board, seed) < 6 for seed in range(20))
+    assert len({generate_move_minimax_pruning(board, PLAYER1, seed=7)[0] for _ in range(3)}) == 1
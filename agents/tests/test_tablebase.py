@@ -0,0 +1,102 @@
+import numpy as np
+from agents.Common import PLAYER1, PLAYER2
+from agents.tests.test_helpers import *
+
+
+def negamax(geometry, position: int, mask: int) -> int:
+    """
+    exact result of a position for the player to move, 1 win, 0 draw, -1 loss
+    """
+    best = -1 if geometry.legal_columns(mask) else 0
+    for column in geometry.legal_columns(mask):
+        next_position, next_mask = geometry.play(position, mask, column)
+        if geometry.is_win(next_mask ^ next_position):
+            return 1
+        best = max(best, -negamax(geometry, next_position, next_mask))
+    return best
+
+
+def test_retrograde(tmp_path):
+    from agents.tablebase import build, Tablebase, WIN, DRAW, LOSS
+    from agents.Common import moves_to_board, player_to_move
+
+    path = str(tmp_path / "tablebase.bin")
+    count = build(path, 12, rows=3, columns=4, n=3)
+    tablebase = Tablebase(path)
+    assert len(tablebase) == count > 0
+    geometry = tablebase.geometry
+
+    for moves in ("", "1", "12", "1122", "0330", "0123", "0011"):
+        board = moves_to_board(moves, 3, 4)
+        player = player_to_move(board)
+        expected = {1: WIN, 0: DRAW, -1: LOSS}[negamax(geometry, *geometry.from_board(board, player))]
+        assert tablebase.probe(board, player, n=3) == expected
+        assert tablebase.probe(np.fliplr(board), player, n=3) == expected
+    assert tablebase.probe(moves_to_board("", 3, 4), PLAYER1) is None  # connect four, not three
+
+
+def test_build_from_games(tmp_path):
+    from agents.tablebase import build, Tablebase
+    from agents.Common import moves_to_board
+
+    # nobody connects four in the first 36 moves of the first game, the second one is won early
+    games = ["440405664640536124533355106061252202", "0101010"]
+    path = str(tmp_path / "tablebase.bin")
+    assert build(path, 6, games) > 0
+    tablebase = Tablebase(path)
+    board = moves_to_board(games[0])
+    assert tablebase.probe(board, PLAYER1) is not None
+    assert tablebase.probe(np.fliplr(board), PLAYER1) == tablebase.probe(board, PLAYER1)
+    assert tablebase.probe(moves_to_board(games[0][:-2]), PLAYER1) is None  # 8 empty cells
+
+    assert build(path, 6, games[1:]) == len(Tablebase(path)) == 0
+
+
+def test_search_with_tablebase(tmp_path):
+    from agents.tablebase import build, Tablebase, WIN, LOSS
+    from agents.search import search
+    from agents.Common import moves_to_board, player_to_move
+
+    path = str(tmp_path / "tablebase.bin")
+    build(path, 12, rows=3, columns=4, n=3)
+    tablebase = Tablebase(path)
+    for moves in ("", "1", "12", "0330", "0123"):
+        board = moves_to_board(moves, 3, 4)
+        player = player_to_move(board)
+        result = search(board, player, depth=2, n=3, seed=0, tablebase=tablebase)
+        exact = {WIN: np.inf, LOSS: -np.inf}.get(tablebase.probe(board, player, n=3), 0.0)
+        assert result.utility == exact
+        assert result.nodes <= search(board, player, depth=2, n=3, seed=0).nodes
+
+
+def test_search_with_tablebase_and_cache(tmp_path):
+    from agents.tablebase import build, Tablebase
+    from agents.cache import SearchCache
+    from agents.search import search
+    from agents.Common import moves_to_board, player_to_move
+
+    path = str(tmp_path / "tablebase.bin")
+    build(path, 12, rows=3, columns=4, n=3)
+    tablebase = Tablebase(path)
+    with SearchCache(str(tmp_path / "cache.db")) as cache:
+        for moves in ("", "1", "12", "0330"):
+            board = moves_to_board(moves, 3, 4)
+            player = player_to_move(board)
+            # results found with the tablebase are not reused by searches without it, and conversely
+            for settings in ({}, {"tablebase": tablebase}, {}):
+                cached = search(board, player, depth=2, n=3, seed=0, cache=cache, **settings)
+                fresh = search(board, player, depth=2, n=3, seed=0, **settings)
+                assert (cached.move, cached.utility) == (fresh.move, fresh.utility)
+
+
+def test_digest(tmp_path):
+    from agents.tablebase import build, Tablebase
+
+    paths = [str(tmp_path / f"tablebase{i}.bin") for i in range(3)]
+    # same k, different roots: the digests tell the tablebases apart
+    build(paths[0], 6, ["440405664640536124533355106061252202"])
+    build(paths[1], 6, ["440405664640536124533355106061252220"])
+    build(paths[2], 6, ["440405664640536124533355106061252202"])
+    digests = [Tablebase(path).digest for path in paths]
+    assert digests[0] != digests[1]
+    assert digests[0] == digests[2]
@@ -0,0 +1,123 @@
+import numpy as np
+from agents.Common import BoardPiece, PLAYER1, PLAYER2
+from agents.tests.test_helpers import *
+
+
+def test_window_indices():
+    from agents.value_network import window_indices
+
+    windows = window_indices(6, 7)
+    assert windows.shape == (69, 4)
+    assert len({tuple(window) for window in windows}) == 69
+
+
+def test_evaluate_batch():
+    from agents.value_network import ValueNetwork, board_features
+    from agents.search import board_children
+    from agents.Common import moves_to_board
+
+    network = ValueNetwork.initialize(138, hidden=8)
+    _, children = board_children(moves_to_board("162535"), PLAYER1)
+    utilities = network.evaluate_batch(children, PLAYER1, PLAYER2)
+
+    assert utilities.shape == (7,)
+    # PLAYER1 connects four by playing column 0 or 4
+    assert utilities[0] == utilities[4] == np.inf
+    assert np.all(np.isfinite(utilities[1:4])) and np.all(np.isfinite(utilities[5:]))
+    assert np.all(network.evaluate_batch(children, PLAYER2, PLAYER1)[[0, 4]] == -np.inf)
+    for child, utility in zip(children, utilities):
+        assert np.isclose(network(child, PLAYER1, PLAYER2), utility)
+    assert board_features(children, PLAYER1, PLAYER2).shape == (7, 138)
+
+
+def test_train_save_load(tmp_path):
+    from agents.value_network import ValueNetwork, training_data
+
+    games = [("3343536", PLAYER2), ("0101010", PLAYER1), ("33", BoardPiece(0))] * 4
+    features, targets = training_data(games)
+    assert features.shape == (2 * 2 * 16 * 4, 138)
+    assert set(np.unique(targets)) == {-1.0, 0.0, 1.0}
+
+    for hidden in (0, 8):
+        network = ValueNetwork.initialize(features.shape[1], hidden)
+        losses = network.train(features, targets, epochs=30, batch_size=32, learning_rate=1e-2)
+        assert losses[-1] < losses[0]
+        network.save(str(tmp_path / "network.npz"))
+        loaded = ValueNetwork.load(str(tmp_path / "network.npz"))
+        assert np.allclose(loaded.predict(features), network.predict(features))
+
+
+def test_batched_search():
+    from agents.value_network import ValueNetwork
+    from agents.search import search
+    from agents.Common import moves_to_board
+
+    network = ValueNetwork.initialize(138, hidden=8)
+    for board, player in ((initialize_test_board(), PLAYER2), (moves_to_board("162535"), PLAYER1)):
+        batched = search(board, player, depth=3, evaluator=network)
+        unbatched = search(board, player, depth=3, evaluator=lambda *args: network(*args))
+        assert batched.move == unbatched.move
+        assert np.isclose(batched.utility, unbatched.utility)
+    assert batched.move in (0, 4)
+
+
+def test_connect_n(tmp_path):
+    import pytest
+    from agents.value_network import ValueNetwork, board_features
+    from agents.search import search
+    from agents.Common import moves_to_board
+
+    # PLAYER1 has four in a row, which doesn't win when five are needed
+    board = moves_to_board("1625354")
+    boards = board[np.newaxis]
+    network = ValueNetwork.initialize(2 * 44, hidden=8, n=5)
+    assert board_features(boards, PLAYER1, PLAYER2, 5).shape == (1, 88)
+    assert np.isfinite(network.evaluate_batch(boards, PLAYER1, PLAYER2)[0])
+    assert ValueNetwork.initialize(138, hidden=8).evaluate_batch(boards, PLAYER1, PLAYER2)[0] == np.inf
+
+    network.save(str(tmp_path / "network.npz"))
+    assert ValueNetwork.load(str(tmp_path / "network.npz")).n == 5
+    assert search(board, PLAYER2, depth=2, evaluator=network, n=5).move is not None
+    # the network isn't used for games it wasn't trained for
+    with pytest.raises(ValueError):
+        search(board, PLAYER2, depth=2, evaluator=network)
+    with pytest.raises(ValueError):
+        ValueNetwork.initialize(138, n=5).evaluate_batch(boards, PLAYER1, PLAYER2)
+
+
+def test_search_cache_per_evaluator(tmp_path):
+    import pytest
+    from agents.value_network import ValueNetwork
+    from agents.cache import SearchCache
+    from agents.search import search
+    from agents.Common import moves_to_board
+
+    board = moves_to_board("33")
+    network = ValueNetwork.initialize(138, hidden=8)
+    network.save(str(tmp_path / "network.npz"))
+    assert ValueNetwork.load(str(tmp_path / "network.npz")).name == network.name
+    assert ValueNetwork.initialize(138, hidden=8, seed=1).name != network.name
+
+    with SearchCache(str(tmp_path / "cache.db")) as cache:
+        with_network = search(board, PLAYER1, depth=3, seed=0, evaluator=network, cache=cache)
+        assert with_network.utility == search(board, PLAYER1, depth=3, seed=0, evaluator=network).utility
+        # the results of the network are not reused by a search with the default evaluator
+        default = search(board, PLAYER1, depth=3, seed=0, cache=cache)
+        assert (default.move, default.utility) == search(board, PLAYER1, depth=3, seed=0)[:2]
+        assert search(board, PLAYER1, depth=3, seed=0, evaluator=network, cache=cache).nodes < with_network.nodes
+        with pytest.raises(ValueError):
+            search(board, PLAYER1, depth=3, seed=0, evaluator=lambda *args: network(*args), cache=cache)
+
+
+def test_training_data_geometry():
+    from agents.value_network import ValueNetwork, training_data, window_indices
+    from agents.search import search
+    from agents.Common import moves_to_board
+
+    # games on a 4x5 board where three in a row win, the features have the windows of that board
+    games = [("01234", PLAYER1), ("4433", PLAYER2)]
+    features, targets = training_data(games, n=3, rows=4, columns=5)
+    assert features.shape == (2 * 2 * 9, 2 * len(window_indices(4, 5, 3)))
+    network = ValueNetwork.initialize(features.shape[1], hidden=4, n=3)
+    network.train(features, targets, epochs=2, batch_size=8)
+    assert search(moves_to_board("44", 4, 5), PLAYER1, depth=2, evaluator=network, n=3).move is not None
@@ -0,0 +1,280 @@
+"""
+Learned evaluator: a small value network in pure NumPy, trained offline from self-play games.
+
+The features of a board are computed from its windows of n cells (69 windows of four cells for a 6x7 board):
+for each window, the number of pieces of the agent if the opponent has none in it, and the number
+of pieces of the opponent if the agent has none in it. The network is linear (hidden=0) or has one
+hidden tanh layer, and predicts the outcome of the game for the agent, between -1 and 1.
+
+Evaluation is batched: ValueNetwork.evaluate_batch scores many boards with one matrix multiply
+per layer, and the search engine uses it to evaluate all the leaf children of a node at once.
+
+usage:
+    python main.py selfplay random random -n 1000 --output games.jsonl
+    python -m agents.value_network games.jsonl -o value_network.npz --hidden 32
+    python main.py bench --value-network value_network.npz
+"""
+import argparse
+import hashlib
+import json
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from agents.Common import BoardPiece, NO_PLAYER, PLAYER1, PLAYER2, apply_player_action
+from agents.Common import initialize_game_state, PlayerAction, get_geometry, ROWS, COLUMNS, CONNECT_N
+
+
+def window_indices(rows: int, cols: int, n: int = CONNECT_N) -> np.ndarray:
+    """
+    :param rows: rows of the board
+    :param cols: columns of the board
+    :param n: length of the windows
+    :return: flat indices of the cells of every horizontal, vertical and diagonal window of n cells,
+    shape (number of windows, n), see agents.Common.Geometry
+    """
+    return get_geometry(rows, cols, n).windows
+
+
+def window_counts(boards: np.ndarray, agent: BoardPiece, opponent: BoardPiece, n: int = CONNECT_N) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param boards: boards of shape (m, rows, cols)
+    :param agent: player for whom the utility is maximized
+    :param opponent: the other player
+    :param n: length of the windows, the number of pieces in a row needed to win
+    :return: for every board and window, the pieces of the agent in windows without opponent pieces,
+    and the pieces of the opponent in windows without agent pieces, both of shape (m, number of windows)
+    """
+    m, rows, cols = boards.shape
+    cells = boards.reshape(m, rows * cols)[:, window_indices(rows, cols, n)]
+    own = np.count_nonzero(cells == agent, axis=2)
+    other = np.count_nonzero(cells == opponent, axis=2)
+    return np.where(other == 0, own, 0), np.where(own == 0, other, 0)
+
+
+def board_features(boards: np.ndarray, agent: BoardPiece, opponent: BoardPiece, n: int = CONNECT_N) -> np.ndarray:
+    """
+    :param boards: boards of shape (m, rows, cols)
+    :param agent: player for whom the utility is maximized
+    :param opponent: the other player
+    :param n: number of pieces in a row needed to win
+    :return: features of the boards for the network, shape (m, 2 * number of windows)
+    """
+    own, other = window_counts(boards, agent, opponent, n)
+    return np.concatenate([own, other], axis=1) / n
+
+
+class ValueNetwork:
+    """
+    Linear model or MLP with one tanh hidden layer, predicting the outcome of a board for the agent
+    """
+
+    def __init__(self, weights: List[np.ndarray], n: int = CONNECT_N):
+        """
+        :param weights: weight matrices and bias vectors of the layers, alternating, e.g. [W1, b1, W2, b2]
+        :param n: number of pieces in a row needed to win in the games the network is for,
+        the search engine refuses to use it for other games
+        """
+        self.weights = [np.asarray(w, dtype=np.float64) for w in weights]
+        self.n = n
+
+    @property
+    def name(self) -> str:
+        """
+        :return: name of the network computed from its weights, the same for the same network after
+        a save and a load, so that the search cache can tell networks apart
+        """
+        digest = hashlib.sha1(str(self.n).encode())
+        for w in self.weights:
+            digest.update(str(w.shape).encode())
+            digest.update(np.ascontiguousarray(w).tobytes())
+        return f"value_network-{digest.hexdigest()[:16]}"
+
+    @classmethod
+    def initialize(cls, n_features: int, hidden: int = 32, seed: int = 0, n: int = CONNECT_N) -> "ValueNetwork":
+        """
+        :param n_features: number of input features
+        :param hidden: units of the hidden layer, 0 for a linear model
+        :param seed: seed of the random initial weights
+        :param n: number of pieces in a row needed to win
+        :return: untrained network
+        """
+        rng = np.random.default_rng(seed)
+        sizes = [n_features, hidden, 1] if hidden else [n_features, 1]
+        weights = []
+        for n_in, n_out in zip(sizes[:-1], sizes[1:]):
+            weights += [rng.normal(0, 1 / np.sqrt(n_in), (n_in, n_out)), np.zeros(n_out)]
+        return cls(weights, n)
+
+    @classmethod
+    def load(cls, path: str) -> "ValueNetwork":
+        """
+        :param path: file written by save
+        :return: the saved network
+        """
+        with np.load(path) as data:
+            layers = sum(name.startswith("w") for name in data.files)
+            n = int(data["n"]) if "n" in data.files else CONNECT_N  # files saved before n was stored
+            return cls([data[f"w{i}"] for i in range(layers)], n)
+
+    def save(self, path: str):
+        """
+        :param path: .npz file where the weights are written
+        """
+        np.savez(path, n=self.n, **{f"w{i}": w for i, w in enumerate(self.weights)})
+
+    def forward(self, features: np.ndarray) -> List[np.ndarray]:
+        """
+        :param features: inputs of shape (m, n_features)
+        :return: activations of every layer, the last one being the predictions of shape (m, 1)
+        """
+        activations = [features]
+        for i in range(0, len(self.weights), 2):
+            activations.append(np.tanh(activations[-1] @ self.weights[i] + self.weights[i + 1]))
+        return activations
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """
+        :param features: inputs of shape (m, n_features)
+        :return: predicted outcomes between -1 and 1, shape (m,)
+        """
+        return self.forward(features)[-1][:, 0]
+
+    def evaluate_batch(self, boards: np.ndarray, agent: BoardPiece, opponent: BoardPiece) -> np.ndarray:
+        """
+        :param boards: boards of shape (m, rows, cols)
+        :param agent: player for whom utility is being maximized
+        :param opponent: opponent player for whom utility is being minimized
+        :return: utilities of the boards, -inf if the opponent connected four (n), inf if the agent did,
+        the predicted outcome otherwise
+        """
+        own, other = window_counts(boards, agent, opponent, self.n)
+        if 2 * own.shape[1] != self.weights[0].shape[0]:
+            raise ValueError(f"the network has {self.weights[0].shape[0]} inputs, boards of shape "
+                             f"{boards.shape[1:]} have {2 * own.shape[1]} features")
+        utilities = self.predict(np.concatenate([own, other], axis=1) / self.n)
+        utilities[np.any(own == self.n, axis=1)] = np.inf
+        utilities[np.any(other == self.n, axis=1)] = -np.inf
+        return utilities
+
+    def __call__(self, board: np.ndarray, agent: BoardPiece, opponent: BoardPiece) -> float:
+        """
+        Evaluator with the same signature as calculate_utility
+        """
+        return float(self.evaluate_batch(board[np.newaxis], agent, opponent)[0])
+
+    def train(self, features: np.ndarray, targets: np.ndarray, epochs: int = 20, batch_size: int = 256,
+              learning_rate: float = 1e-3, seed: int = 0) -> List[float]:
+        """
+        Minimize the mean squared error of the predictions with Adam
+        :param features: inputs of shape (m, n_features)
+        :param targets: outcomes between -1 and 1, shape (m,)
+        :param epochs: passes over the data
+        :param batch_size: examples per gradient step
+        :param learning_rate: step size of Adam
+        :param seed: seed of the shuffling of the examples
+        :return: mean squared error after each epoch
+        """
+        rng = np.random.default_rng(seed)
+        moments = [np.zeros_like(w) for w in self.weights]
+        velocities = [np.zeros_like(w) for w in self.weights]
+        beta_1, beta_2, epsilon = 0.9, 0.999, 1e-8
+        step = 0
+        losses = []
+        for _ in range(epochs):
+            order = rng.permutation(len(features))
+            for start in range(0, len(features), batch_size):
+                batch = order[start:start + batch_size]
+                gradients = self.gradients(features[batch], targets[batch])
+                step += 1
+                for i, gradient in enumerate(gradients):
+                    moments[i] = beta_1 * moments[i] + (1 - beta_1) * gradient
+                    velocities[i] = beta_2 * velocities[i] + (1 - beta_2) * gradient ** 2
+                    m_hat = moments[i] / (1 - beta_1 ** step)
+                    v_hat = velocities[i] / (1 - beta_2 ** step)
+                    self.weights[i] -= learning_rate * m_hat / (np.sqrt(v_hat) + epsilon)
+            losses.append(float(np.mean((self.predict(features) - targets) ** 2)))
+        return losses
+
+    def gradients(self, features: np.ndarray, targets: np.ndarray) -> List[np.ndarray]:
+        """
+        :param features: inputs of shape (m, n_features)
+        :param targets: outcomes, shape (m,)
+        :return: gradients of the mean squared error with respect to every weight, by backpropagation
+        """
+        activations = self.forward(features)
+        delta = 2 * (activations[-1] - targets[:, np.newaxis]) / len(features)
+        gradients = []
+        for i in range(len(self.weights) - 2, -1, -2):
+            delta = delta * (1 - activations[i // 2 + 1] ** 2)
+            gradients = [activations[i // 2].T @ delta, delta.sum(axis=0)] + gradients
+            delta = delta @ self.weights[i].T
+        return gradients
+
+
+def read_games(lines: Iterable[str]) -> Iterable[Tuple[str, BoardPiece]]:
+    """
+    :param lines: JSON lines with the "moves" and "winner" of each game, as written by main.py selfplay --output
+    :return: iterator over the moves and winner of each game
+    """
+    for line in lines:
+        if line.strip():
+            game = json.loads(line)
+            yield game["moves"], BoardPiece(game["winner"])
+
+
+def training_data(games: Iterable[Tuple[str, BoardPiece]], n: int = CONNECT_N, rows: int = ROWS,
+                  columns: int = COLUMNS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Every position of every game is used from the point of view of both players,
+    and mirrored left to right, since the outcome doesn't change with the mirroring.
+    :param games: moves and winner of each game
+    :param n: number of pieces in a row needed to win in the games
+    :param rows: rows of the board of the games
+    :param columns: columns of the board of the games
+    :return: features and outcomes (1 win, 0 draw, -1 loss) of all the positions
+    """
+    boards = []
+    winners = []
+    for moves, winner in games:
+        board = initialize_game_state(rows, columns)
+        player = PLAYER1
+        for move in moves:
+            board = apply_player_action(board, PlayerAction(move), player, copy=True)
+            boards += [board, np.fliplr(board)]
+            winners += [winner, winner]
+            player = PLAYER2 if player == PLAYER1 else PLAYER1
+    boards = np.array(boards, dtype=BoardPiece)
+    winners = np.array(winners, dtype=BoardPiece)
+    features = []
+    targets = []
+    for agent, opponent in ((PLAYER1, PLAYER2), (PLAYER2, PLAYER1)):
+        features.append(board_features(boards, agent, opponent, n))
+        targets.append(np.where(winners == agent, 1.0, np.where(winners == NO_PLAYER, 0.0, -1.0)))
+    return np.concatenate(features), np.concatenate(targets)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m agents.value_network",
+                                     description="train a value network from self-play games")
+    parser.add_argument("games", help="JSON lines file of games, from main.py selfplay --output")
+    parser.add_argument("-o", "--output", default="value_network.npz", help="file where the weights are saved")
+    parser.add_argument("--hidden", type=int, default=32, help="hidden units, 0 for a linear model")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=ROWS, help="rows of the board")
+    parser.add_argument("--columns", type=int, default=COLUMNS, help="columns of the board")
+    parser.add_argument("-n", "--connect", type=int, default=CONNECT_N, help="pieces in a row needed to win")
+    args = parser.parse_args(argv)
+
+    with open(args.games) as games:
+        features, targets = training_data(read_games(games), args.connect, args.rows, args.columns)
+    network = ValueNetwork.initialize(features.shape[1], args.hidden, args.seed, args.connect)
+    losses = network.train(features, targets, args.epochs, learning_rate=args.learning_rate, seed=args.seed)
+    print(f"{len(features)} positions, mean squared error {losses[0]:.4f} -> {losses[-1]:.4f}")
+    network.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,25 @@
-import numpy as np
-from typing import Optional, Callable, Tuple
-from agents.Common import PlayerAction, BoardPiece, SavedState, GenMove
-from agents.agent_random import generate_move
-from agents.agent_minimax import generate_move_minimax
-from agents.agent_minimax_prunning import generate_move_minimax_pruning
+"""
+usage:
+    python main.py play [AGENT_1] [AGENT_2]          play against an agent, or watch two agents play
+    python main.py selfplay AGENT_1 AGENT_2 -n 10    play headless games and print the results
+    python main.py worker HOST:PORT                  play the games of a distributed selfplay (--listen)
+    python main.py bench                             benchmark the search and the cold start
+    python main.py analyze positions.txt             analyze positions, see python -m agents.analysis -h
+    python main.py perft --depth 7                   count the game tree, see python -m agents.perft -h
 
+Agents are resolved by name through agents.registry and only imported when a command needs them,
+numpy included, so that short-lived commands start fast.
+"""
+from __future__ import annotations
 
-def user_move(board: np.ndarray, _player: BoardPiece, saved_state: Optional[SavedState]) -> Tuple[
-    PlayerAction, Optional[SavedState]]:
-    """
+import argparse
+import sys
+from typing import TYPE_CHECKING, Callable
+from agents.registry import available_agents, load_agent
+from agents.human import user_move
 
-    :param board: current state of the board
-    :param _player: which player the user is
-    :param saved_state: The idea is that the first time in a game that generate_move is called,
-    the value of that argument is None.
-    Then in the process of choosing its first action,
-    your agent might do a bunch of computation that it could reuse for future moves.
-    Instead of just throwing that away, you can put it in an instance of your SavedState class'
-    :return: move that the current player chose and saved_state again, because it's not going to be used for now
-    """
-    action = PlayerAction(-1)
-    while not 0 <= action < board.shape[1]:
-        try:
-            action = PlayerAction(input("Column? "))
-        except ValueError:
-            print("Input could not be converted to the dtype PlayerAction, try entering an integer.")
-    return action, saved_state
+if TYPE_CHECKING:
+    from agents.Common import GenMove
 
 
 def human_vs_agent(
@@ -81,11 +75,116 @@ def human_vs_agent(
                     break
 
 
-if __name__ == "__main__":
+def run_selfplay(args: argparse.Namespace):
+    """
+    Play the games of the selfplay command, locally or through distributed workers,
+    print their results and record them in args.output
+    """
+    import json
+    from agents.Common import PLAYER1, PLAYER2
+
+    if args.listen is None and not args.local_workers:
+        from agents.selfplay import selfplay as play_games
+
+        games = play_games(args.agent_1, args.agent_2, args.games, args.opening)
+    else:
+        games = distributed_games(args)
+
+    record = None if args.output is None else open(args.output, "a")
+    # wins are counted by side, since both agents can have the same name
+    score = {"player 1": 0, "player 2": 0, "draw": 0}
+    for first, second, winner, moves in games:
+        side = {PLAYER1: "player 1", PLAYER2: "player 2"}.get(winner, "draw")
+        score[side] += 1
+        result = {PLAYER1: f"{first} (player 1)", PLAYER2: f"{second} (player 2)"}.get(winner, "draw")
+        print(f"{first} vs {second}: {result} {moves}")
+        if record is not None:
+            record.write(json.dumps({"player1": first, "player2": second, "winner": int(winner),
+                                     "moves": moves}) + "\n")
+            record.flush()
+    if record is not None:
+        record.close()
+    print(", ".join(f"{side} {count}" for side, count in score.items()))
+
+
+def distributed_games(args: argparse.Namespace):
     """
-    uncomment function corresponding to game we want to play
+    :return: iterator over (agent playing PLAYER1, agent playing PLAYER2, winner, moves) of the games
+    played by the workers, in the order they finish
     """
-    #    human_vs_agent(generate_move)
-    #    human_vs_agent(user_move)
-    #    human_vs_agent(generate_move_1=generate_move_minimax, generate_move_2=generate_move_minimax_pruning)
-    human_vs_agent(generate_move_1=generate_move_minimax_pruning, generate_move_2=generate_move_minimax_pruning)
+    from multiprocessing import Process
+    from agents.Common import BoardPiece
+    from agents.distributed import Coordinator, selfplay_jobs, run_worker, parse_address
+
+    host, port = parse_address(args.listen or "127.0.0.1:0")
+    jobs = selfplay_jobs(args.agent_1, args.agent_2, args.games, args.opening)
+    with Coordinator(jobs, host, port) as coordinator:
+        print(f"waiting for workers on {coordinator.address[0]}:{coordinator.address[1]}", file=sys.stderr)
+        workers = [Process(target=run_worker, args=coordinator.address) for _ in range(args.local_workers)]
+        for worker in workers:
+            worker.start()
+        for result in coordinator.results():
+            if "error" in result:
+                print(f"game {result['id']} failed: {result['error']}", file=sys.stderr)
+                continue
+            yield result["agent_1"], result["agent_2"], BoardPiece(result["winner"]), result["moves"]
+        for worker in workers:
+            worker.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Connect four agents")
+    commands = parser.add_subparsers(dest="command")
+
+    play = commands.add_parser("play", help="play against an agent, or watch two agents play")
+    play.add_argument("agent_1", nargs="?", default="alphabeta", choices=available_agents())
+    play.add_argument("agent_2", nargs="?", default="human", choices=available_agents())
+
+    selfplay = commands.add_parser("selfplay", help="play headless games between two agents")
+    selfplay.add_argument("agent_1", choices=available_agents())
+    selfplay.add_argument("agent_2", choices=available_agents())
+    selfplay.add_argument("-n", "--games", type=int, default=2, help="number of games, alternating who starts")
+    selfplay.add_argument("--opening", default="", help="moves played at the start of every game, e.g. 33")
+    selfplay.add_argument("-o", "--output", default=None,
+                          help="JSON lines file where the games are recorded, e.g. to train agents.value_network")
+    selfplay.add_argument("--listen", default=None, metavar="HOST:PORT",
+                          help="hand out the games to workers connecting to this address (see agents.distributed)")
+    selfplay.add_argument("--local-workers", type=int, default=0,
+                          help="worker processes to start on this machine, implies --listen 127.0.0.1:0 by default")
+
+    worker = commands.add_parser("worker", help="play the games handed out by a selfplay --listen coordinator")
+    worker.add_argument("address", metavar="HOST:PORT")
+
+    commands.add_parser("bench", help="benchmark the search engine and the cold start, "
+                                      "options are passed to python -m agents.benchmark")
+    commands.add_parser("analyze", help="analyze positions from a file, "
+                                        "options are passed to python -m agents.analysis")
+    commands.add_parser("perft", help="check and time the move generation of the board backends, "
+                                      "options are passed to python -m agents.perft")
+
+    args, rest = parser.parse_known_args(argv)
+    if args.command in ("bench", "analyze", "perft"):
+        if args.command == "bench":
+            from agents.benchmark import main as command
+        elif args.command == "analyze":
+            from agents.analysis import main as command
+        else:
+            from agents.perft import main as command
+        return command(rest)
+    if rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+
+    if args.command == "selfplay":
+        run_selfplay(args)
+    elif args.command == "worker":
+        from agents.distributed import run_worker, parse_address
+
+        print(f"played {run_worker(*parse_address(args.address))} games")
+    else:
+        agent_1 = getattr(args, "agent_1", "alphabeta")
+        agent_2 = getattr(args, "agent_2", "alphabeta")
+        human_vs_agent(generate_move_1=load_agent(agent_1), generate_move_2=load_agent(agent_2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())